@@ -1,42 +1,183 @@
 import sys
 import os
+import re
+import ast
+import math
+import time
+import heapq
+import queue
+import struct
+import threading
 import traceback
+from array import array
+from itertools import compress
+from bisect import bisect_left, bisect_right
+from urllib.parse import quote as _quote_name
+import io
+import csv
+import json
+import tempfile
+from datetime import date, timedelta
 import xlwings as xw
 import pandas as pd
+from quoteshm import QuoteTableWriter, SHM_NAME
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Arrow / Parquet export is optional
+    pa = None
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton,
     QFileDialog, QVBoxLayout, QHBoxLayout, QMessageBox, QComboBox,
     QGridLayout, QGraphicsDropShadowEffect, QShortcut, QFrame,
-    QListWidget, QListWidgetItem, QScrollArea, QStyledItemDelegate, QStyle, QShortcut
+    QListWidget, QListWidgetItem, QScrollArea, QStyledItemDelegate, QStyle, QShortcut,
+    QMenu, QInputDialog, QTabBar, QSpacerItem, QSizePolicy
+)
+from PyQt5.QtGui import (
+    QColor, QKeySequence, QPixmap, QPainter, QPolygon, QBrush, QFont, QFontDatabase, QDrag,
+    QFontMetrics, QStaticText, QTransform
 )
-from PyQt5.QtGui import QColor, QKeySequence, QPixmap, QPainter, QPolygon, QBrush, QFont, QFontDatabase
 from PyQt5.QtCore import (
-    Qt, QTimer, QPoint, QEvent, QRect,
+    Qt, QTimer, QPoint, QPointF, QSize, QEvent, QRect, QMimeData,
     QEasingCurve, QPropertyAnimation, QParallelAnimationGroup
 )
 
 # -------------------------------
 # Config
 # -------------------------------
-CONFIG_FILE = "config.txt"
+SETTINGS_FILE = "settings.json"
+SETTINGS_VERSION = 1
+CONFIG_FILE = "config.txt"  # old key=value format, migrated to SETTINGS_FILE on first start
 EXCLUDED = {""}
-REFRESH_INTERVAL_MS = 100
+SHEET_FIRST_ROW = 2  # sheet layout: B=Symbol, C=Bid, D=Ask, E=Low, F=High
+SHEET_LAST_ROW = 500
+DIRECTORY_RESCAN_READS = 50  # re-scan the symbol column every N reads
+READ_RUN_GAP = 4  # subscribed rows this close together are read in one range
+REFRESH_INTERVAL_MS = 100  # ingest: how often the sheet is read
+RENDER_FPS = 30  # render: max repaints per second (0 = display refresh rate)
 MAX_BOXES = 12  # initial number of rows to create (list can grow)
+ROW_SHADOWS = True  # per-row drop shadow (costs an offscreen render per row)
+ROW_CONTROLS_WIDTH = 72  # space reserved for ▲▼/✖/➕ until a row builds its buttons
+DEFAULT_WATCHLIST = "Main"
+FLASH_MS = 1500  # tick flash fades back to the normal colour over this time
+FLASH_STEPS = 8  # colour levels in the fade (each level is one restyle)
+FLASH_TICK_MS = 40  # animation clock interval while anything is fading
+SAVE_DEBOUNCE_MS = 500  # settings are persisted this long after the last change
+ROW_MIME = "application/x-liveprices-rows"
+BAR_TIMEFRAMES = (1, 60, 300)  # OHLC bar sizes in seconds
+BAR_DIR = "bars"  # completed bars: bars/<YYYYMMDD>/<tf>s/<symbol>.bin
+BAR_FLUSH_MS = 5000  # completed bars are handed to the writer thread this often
+EXPORT_DIR = "exports"
+EXPORT_FORMAT = "csv"  # csv, arrow (Arrow IPC file) or parquet
+EXPORT_INTERVAL_S = 0  # scheduled snapshot export period (0 = only on Ctrl+Shift+E)
+MOVERS_TOP_K = 20  # "top movers" mode ranks this many rows at the top of the board
+MOVERS_HYSTERESIS = 0.1  # a row only overtakes another when its move is 10% larger
+STALE_AFTER_S = 30  # a quote unchanged this long is flagged stale (per-symbol: STALE.<SYM>=secs)
+STALE_CHECK_MS = 1000
+SHM_ENABLED = True  # publish quotes to shared memory for local consumers (see quoteshm.py)
+PRICE_POINT_SIZE = 22  # price cells keep this size whatever font family is chosen
+PRICE_CELL_CHARS = 11  # minimum width per price cell, in digit widths (fits any _fmt output)
+ALERTS_FILE = "alerts.txt"
+SYNTHETICS_FILE = "synthetics.txt"  # derived symbols, e.g. EURJPY = EURUSD * USDJPY
+ALERT_HIGHLIGHT_MS = 3000  # how long a row stays highlighted after an alert
+ALERT_LOG_MAX = 500  # notification log keeps this many entries
 # -------------------------------
 # Config file handling
 # -------------------------------
-def save_config(file_path, sheet_name, rows=None, font=None, is_darkmode=True):
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        f.write(f"FILE_PATH={file_path}\n")
-        f.write(f"SHEET_NAME={sheet_name}\n")
-        if font:
-            f.write(f"FONT={font.family()},{font.pointSize()}\n")
-        f.write(f"IS_DARKMODE={is_darkmode}\n")
-        if rows:
-            f.write(f"ROWS={','.join(rows)}\n")
+def settings_dict(file_path, sheet_name, font=None, is_darkmode=True,
+                  refresh_ms=None, render_fps=None, watchlists=None, active_watchlist=None,
+                  export=None, stale=None):
+    """Build the settings.json document (plain JSON types only)."""
+    settings = {
+        "version": SETTINGS_VERSION,
+        "file_path": file_path,
+        "sheet_name": sheet_name,
+        "dark_mode": bool(is_darkmode),
+        "refresh_ms": REFRESH_INTERVAL_MS if refresh_ms is None else int(refresh_ms),
+        "render_fps": RENDER_FPS if render_fps is None else float(render_fps),
+        "watchlists": {name: list(symbols) for name, symbols in (watchlists or {}).items()},
+        "active_watchlist": active_watchlist,
+        "export": {
+            "dir": (export or {}).get("DIR", EXPORT_DIR),
+            "format": (export or {}).get("FORMAT", EXPORT_FORMAT),
+            "interval_s": float((export or {}).get("INTERVAL_S", EXPORT_INTERVAL_S)),
+        },
+        "stale": {symbol: float(seconds) for symbol, seconds in (stale or {}).items()},
+    }
+    if font:
+        settings["font"] = {"family": font.family(), "size": font.pointSize()}
+    return settings
+
+
+def _encode_settings(settings):
+    return json.dumps(settings, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def save_config(file_path, sheet_name, rows=None, font=None, is_darkmode=True,
+                refresh_ms=None, render_fps=None, watchlists=None, active_watchlist=None,
+                export=None, stale=None):
+    """Write settings.json synchronously (the running board uses SettingsWriter)."""
+    if rows and not watchlists:
+        watchlists = {DEFAULT_WATCHLIST: rows}
+    data = _encode_settings(settings_dict(
+        file_path, sheet_name, font, is_darkmode, refresh_ms, render_fps,
+        watchlists, active_watchlist, export, stale))
+    _atomic_write(SETTINGS_FILE, lambda f: f.write(data))
 
 
 def load_config():
+    """
+    Load settings.json, or migrate the old key=value config.txt if that is
+    all there is. Returns None when neither exists.
+    """
+    if not os.path.exists(SETTINGS_FILE):
+        config = _load_legacy_config()
+        if config:
+            try:
+                save_config(config.get("FILE_PATH", ""), config.get("SHEET_NAME", ""),
+                            rows=config["ROWS"], font=config.get("FONT"),
+                            is_darkmode=config["IS_DARKMODE"],
+                            refresh_ms=config["REFRESH_INTERVAL_MS"],
+                            render_fps=config["RENDER_FPS"],
+                            watchlists=config["WATCHLISTS"],
+                            active_watchlist=config.get("ACTIVE_WATCHLIST"),
+                            export=config["EXPORT"], stale=config["STALE"])
+            except Exception as e:
+                print("Settings migration failed:", e)
+        return config
+    try:
+        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print("Settings unreadable:", e)
+        return None
+    config = {
+        "FILE_PATH": settings.get("file_path", ""),
+        "SHEET_NAME": settings.get("sheet_name", ""),
+        "IS_DARKMODE": settings.get("dark_mode", True),
+        "REFRESH_INTERVAL_MS": int(settings.get("refresh_ms", REFRESH_INTERVAL_MS)),
+        "RENDER_FPS": float(settings.get("render_fps", RENDER_FPS)),
+        "WATCHLISTS": settings.get("watchlists") or {},
+        "ACTIVE_WATCHLIST": settings.get("active_watchlist"),
+        "STALE": settings.get("stale") or {},
+    }
+    font = settings.get("font")
+    if font:
+        config["FONT"] = QFont(font["family"], int(font["size"]))
+    export = settings.get("export") or {}
+    config["EXPORT"] = {
+        "DIR": export.get("dir", EXPORT_DIR),
+        "FORMAT": export.get("format", EXPORT_FORMAT),
+        "INTERVAL_S": float(export.get("interval_s", EXPORT_INTERVAL_S)),
+    }
+    watchlists = config["WATCHLISTS"]
+    config["ROWS"] = watchlists.get(config["ACTIVE_WATCHLIST"]) or next(iter(watchlists.values()), [])
+    return config
+
+
+def _load_legacy_config():
+    """Parse the old key=value config.txt (read once, for migration)."""
     if not os.path.exists(CONFIG_FILE):
         return None
     config = {}
@@ -51,13 +192,125 @@ def load_config():
         family, size = config["FONT"].split(",")
         config["FONT"] = QFont(family, int(size))
     config["IS_DARKMODE"] = config.get("IS_DARKMODE","True") == "True"
+    config["REFRESH_INTERVAL_MS"] = int(config.get("REFRESH_INTERVAL_MS", REFRESH_INTERVAL_MS))
+    config["RENDER_FPS"] = float(config.get("RENDER_FPS", RENDER_FPS))
     if "ROWS" in config:
         config["ROWS"] = config["ROWS"].split(",")
     else:
         config["ROWS"] = []
+    config["EXPORT"] = {
+        "DIR": config.get("EXPORT_DIR", EXPORT_DIR),
+        "FORMAT": config.get("EXPORT_FORMAT", EXPORT_FORMAT),
+        "INTERVAL_S": float(config.get("EXPORT_INTERVAL_S", EXPORT_INTERVAL_S)),
+    }
+    config["STALE"] = {
+        key.split(".", 1)[1]: float(val)
+        for key, val in config.items() if key.startswith("STALE.")
+    }
+    config["WATCHLISTS"] = {
+        key.split(".", 1)[1]: [s for s in val.split(",") if s]
+        for key, val in config.items() if key.startswith("WATCHLIST.")
+    }
     return config
 
 
+class SettingsWriter:
+    """
+    Persists settings on a worker thread. Saves are coalesced: only the
+    latest document is kept while a write is in progress, unchanged
+    documents are skipped, and every write is an atomic replace.
+    """
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self.last_error = None
+        self._pending = None
+        self._written = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._write_loop, daemon=True)
+        self._worker.start()
+
+    def save(self, settings):
+        with self._cond:
+            self._pending = settings
+            self._cond.notify()
+
+    def close(self):
+        """Write anything still pending, then stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join(timeout=5)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                settings, self._pending = self._pending, None
+            if settings is None:
+                return
+            try:
+                data = _encode_settings(settings)
+                if data != self._written:
+                    _atomic_write(self.path, lambda f: f.write(data))
+                    self._written = data
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                print("Settings save error:", e)
+                traceback.print_exc()
+
+
+def load_alerts():
+    """
+    Read alert definitions, one per line:
+        SYMBOL,FIELD,DIRECTION,LEVEL[,HYSTERESIS[,COOLDOWN_S]]
+    FIELD is bid/ask/spread, DIRECTION is above/below. '#' starts a comment.
+    """
+    alerts = []
+    if not os.path.exists(ALERTS_FILE):
+        return alerts
+    with open(ALERTS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = [p.strip() for p in line.split(",")]
+            try:
+                symbol, field, direction, level = parts[:4]
+                hysteresis = float(parts[4]) if len(parts) > 4 else 0.0
+                cooldown = float(parts[5]) if len(parts) > 5 else 0.0
+                alerts.append(Alert(symbol, field.lower(), direction.lower(),
+                                    float(level), hysteresis, cooldown))
+            except Exception as e:
+                print("Bad alert line:", line, e)
+    return alerts
+
+
+def load_synthetics():
+    """
+    Read synthetic symbol formulas, one per line:
+        NAME = EXPRESSION
+    e.g. EURJPY = EURUSD * USDJPY, or 0.5 * [US30.cash] + 0.5 * [GER40.cash]
+    for symbols that are not plain names. '#' starts a comment.
+    """
+    formulas = {}
+    if not os.path.exists(SYNTHETICS_FILE):
+        return formulas
+    with open(SYNTHETICS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, sep, expr = line.partition("=")
+            if not sep or not name.strip() or not expr.strip():
+                print("Bad synthetic line:", line)
+                continue
+            formulas[name.strip()] = expr.strip()
+    return formulas
+
+
 # -------------------------------
 # Helpers
 # -------------------------------
@@ -80,6 +333,31 @@ def _fmt(price):
     except Exception:
         return str(price) if price is not None else ""
 
+def _atomic_write(path, write):
+    """Call write(f) on a temp file next to `path`, then rename it into place."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+
+def _blend(color, base, t):
+    """Mix `color` towards `base` by fraction t (0 = color, 1 = base)."""
+    c1, c2 = QColor(color), QColor(base)
+    r = round(c1.red() + (c2.red() - c1.red()) * t)
+    g = round(c1.green() + (c2.green() - c1.green()) * t)
+    b = round(c1.blue() + (c2.blue() - c1.blue()) * t)
+    return QColor(r, g, b).name()
+
 # -------------------------------
 # Arrow Helper (kept)
 # -------------------------------
@@ -103,12 +381,126 @@ def create_arrow(color, direction="up"):
 
 
 
+# -------------------------------
+# Price Cell (cached glyph layout)
+# -------------------------------
+class GlyphCache:
+    """
+    Laid-out QStaticText per character for one font, plus a fixed digit
+    advance so numbers never shift. Shared by every price cell using the
+    font; colour comes from the painter pen, so a theme change only needs
+    a repaint.
+    """
+    _caches = {}  # font key -> GlyphCache
+
+    @classmethod
+    def for_font(cls, font):
+        cache = cls._caches.get(font.key())
+        if cache is None:
+            cache = cls._caches[font.key()] = cls(font)
+        return cache
+
+    @classmethod
+    def invalidate(cls):
+        cls._caches.clear()
+
+    def __init__(self, font):
+        self.font = QFont(font)
+        metrics = QFontMetrics(self.font)
+        self.digit_advance = max(metrics.horizontalAdvance(d) for d in "0123456789")
+        self.ascent = metrics.ascent()
+        self.height = metrics.height()
+        self._metrics = metrics
+        self.glyphs = {}  # char -> (QStaticText, advance)
+
+    def glyph(self, ch):
+        entry = self.glyphs.get(ch)
+        if entry is None:
+            text = QStaticText(ch)
+            text.setTextFormat(Qt.PlainText)
+            text.prepare(QTransform(), self.font)
+            advance = self.digit_advance if ch.isdigit() else self._metrics.horizontalAdvance(ch)
+            entry = self.glyphs[ch] = (text, advance)
+        return entry
+
+
+class PriceCell(QWidget):
+    """
+    Numeric cell painted from cached glyphs. setText() only repaints this
+    cell's rectangle; its size depends on the font alone, so a tick never
+    triggers a relayout.
+    """
+    def __init__(self, text=""):
+        super().__init__()
+        self._text = text
+        self._color = QColor("white")
+        self._bold = False
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setFont(self.font())
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        if text != self._text:
+            self._text = text
+            self.update()
+
+    def setColor(self, color, bold=False):
+        color = QColor(color)
+        if color != self._color or bold != self._bold:
+            self._color = color
+            self._bold = bold
+            self.update()
+
+    def setFont(self, font):
+        font = QFont(font)
+        font.setPointSize(PRICE_POINT_SIZE)
+        font.setBold(False)
+        if font.key() == self.font().key() and hasattr(self, "_fonts"):
+            return
+        bold = QFont(font)
+        bold.setBold(True)
+        self._fonts = (font, bold)
+        super().setFont(font)
+        self.updateGeometry()  # only on font changes, never on ticks
+
+    def sizeHint(self):
+        cache = GlyphCache.for_font(self._fonts[1])
+        return QSize(cache.digit_advance * PRICE_CELL_CHARS, cache.height)
+
+    def minimumSizeHint(self):
+        # never narrower than the widest _fmt output: clipped digits would read as a valid price
+        return self.sizeHint()
+
+    def paintEvent(self, event):
+        if not self._text:
+            return
+        cache = GlyphCache.for_font(self._fonts[1 if self._bold else 0])
+        painter = QPainter(self)
+        painter.setFont(cache.font)  # glyphs were prepared with this font; a mismatch re-lays them out
+        painter.setPen(self._color)
+        x = 0
+        y = (self.height() - cache.height) / 2
+        for ch in self._text:
+            text, advance = cache.glyph(ch)
+            if ch.isdigit():
+                # centre each digit in the fixed advance
+                offset = (advance - text.size().width()) / 2
+            else:
+                offset = 0
+            painter.drawStaticText(QPointF(x + offset, y), text)
+            x += advance
+        painter.end()
+
+
 # -------------------------------
 # Price Box
 # -------------------------------
 class PriceBox(QFrame):
     def __init__(self, symbol="", row_index=0, remove_callback=None, add_callback=None, parent_widget=None, header_symbol_lbl = None, header_frame = None):
         super().__init__()
+        self.setObjectName("row")  # frame style targets this row only, not its QLabel children
         self.last_bid = 0.0
         self.last_ask = 0.0
         self.remove_callback = remove_callback
@@ -116,22 +508,25 @@ class PriceBox(QFrame):
         self.parent_widget = parent_widget  # MainWindow
         self.header_symbol_lbl = header_symbol_lbl
         self.header_frame = header_frame
+        self.bg_color = None
+        self.alert_highlight = False
+        self.selected = False
+        self.stale = False
+        self._press_pos = None
         
 
         # shadow + style
-        shadow = QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(25)
-        shadow.setColor(QColor(212, 175, 55, 120))
-        shadow.setOffset(2, 2)
-        self.setGraphicsEffect(shadow)
+        if ROW_SHADOWS:
+            shadow = QGraphicsDropShadowEffect()
+            shadow.setBlurRadius(25)
+            shadow.setColor(QColor(212, 175, 55, 120))
+            shadow.setOffset(2, 2)
+            self.setGraphicsEffect(shadow)
 
         layout = QHBoxLayout(self)
         layout.setContentsMargins(10,5,10,5)
         layout.setSpacing(12)
 
-        
-        
-
         # Symbol
         self.symbol = QLabel(symbol)
         self.symbol.setStyleSheet("color: white; font-size: 20pt; ")
@@ -139,98 +534,83 @@ class PriceBox(QFrame):
         layout.addWidget(self.symbol, 1)
 
         # Bid
-        self.bid = QLabel("")
-        self.bid.setStyleSheet("color: white; font-size: 22pt;")
-        self.bid_arrow = QLabel()
-        bid_layout = QHBoxLayout()
-        bid_layout.setContentsMargins(0,0,0,0)
-        bid_layout.setSpacing(4)
-        bid_layout.addWidget(self.bid)
-        bid_layout.addWidget(self.bid_arrow)
-        bid_frame = QFrame()
-        bid_frame.setLayout(bid_layout)
-        layout.addWidget(bid_frame,1)
+        self.bid = PriceCell("")
+        layout.addWidget(self.bid,1)
 
         # Ask
-        self.ask = QLabel("")
-        self.ask.setStyleSheet("color: white; font-size: 22pt;")
-        self.ask_arrow = QLabel()
-        ask_layout = QHBoxLayout()
-        ask_layout.setContentsMargins(0,0,0,0)
-        ask_layout.setSpacing(4)
-        ask_layout.addWidget(self.ask)
-        ask_layout.addWidget(self.ask_arrow)
-        ask_frame = QFrame()
-        ask_frame.setLayout(ask_layout)
-        layout.addWidget(ask_frame,1)
+        self.ask = PriceCell("")
+        layout.addWidget(self.ask,1)
 
         # High
-        self.high = QLabel("")
-        self.high.setStyleSheet("color: white; font-size: 22pt;")
+        self.high = PriceCell("")
         layout.addWidget(self.high,1)
 
         # Low
-        self.low = QLabel("")
-        self.low.setStyleSheet("color: white; font-size: 22pt;")
+        self.low = PriceCell("")
         layout.addWidget(self.low,1)
 
+        # Row buttons are built on first hover (or when ➕ must show);
+        # until then a spacer keeps the columns aligned.
+        self.up_btn = self.down_btn = self.remove_btn = self.add_btn = None
+        self._show_add = False
+        self._controls_spacer = QSpacerItem(ROW_CONTROLS_WIDTH, 0, QSizePolicy.Fixed, QSizePolicy.Minimum)
+        layout.addItem(self._controls_spacer)
+
+    def _button(self, text, style):
+        btn = QPushButton(text)
+        btn.setStyleSheet(style)
+        btn.setFixedSize(28, 28)
+        btn.setCursor(Qt.PointingHandCursor)
+        return btn
+
+    def build_controls(self):
+        """Create ▲▼, ✖ and ➕ the first time they are needed."""
+        if self.up_btn is not None:
+            return
+        layout = self.layout()
+        layout.removeItem(self._controls_spacer)
+        self._controls_spacer = None
+
         # Visual Up/Down arrows (stacked)
         self.arrow_col = QVBoxLayout()
         self.arrow_col.setContentsMargins(0,0,0,0)
         self.arrow_col.setSpacing(0)
-        self.up_btn = QPushButton("▲")
-        self.down_btn = QPushButton("▼")
-        for btn in (self.up_btn, self.down_btn):
-            btn.setStyleSheet("color: gray; font-size: 18pt; background: transparent; border: none;")
-            btn.setFixedSize(28, 28)
-            btn.setCursor(Qt.PointingHandCursor)
+        self.up_btn = self._button("▲", "color: gray; font-size: 18pt; background: transparent; border: none;")
+        self.down_btn = self._button("▼", "color: gray; font-size: 18pt; background: transparent; border: none;")
         self.arrow_col.addWidget(self.up_btn, alignment=Qt.AlignHCenter)
         self.arrow_col.addWidget(self.down_btn, alignment=Qt.AlignHCenter)
         layout.addLayout(self.arrow_col)
-        
-        
-        # initialize button visibility
-        
 
         # Remove (✖) button
-        self.remove_btn = QPushButton("✖")
-        self.remove_btn.setStyleSheet("color: red; font-size: 18pt; background: transparent; border: none;")
-        self.remove_btn.setCursor(Qt.PointingHandCursor)
+        self.remove_btn = self._button("✖", "color: red; font-size: 18pt; background: transparent; border: none;")
         self.remove_btn.clicked.connect(self.remove_self)
         layout.addWidget(self.remove_btn)
 
         # Add (➕) button
-        self.add_btn = QPushButton("➕")
-        self.add_btn.setStyleSheet("color: lime; font-size: 18pt; background: transparent; border: none;")
-        self.add_btn.setCursor(Qt.PointingHandCursor)
+        self.add_btn = self._button("➕", "color: lime; font-size: 18pt; background: transparent; border: none;")
         self.add_btn.clicked.connect(self.start_add)
         layout.addWidget(self.add_btn)
 
-        # Input + dropdown for symbol search (hidden by default)
-        self.input = QLineEdit()
-        self.input.setStyleSheet("font-size: 18pt;")
-        self.input.hide()
-        layout.addWidget(self.input, 2)
-
-        self.dropdown = QListWidget()
-        self.dropdown.setWindowFlags(Qt.Popup)
-        self.dropdown.setFocusPolicy(Qt.NoFocus)
-        self.dropdown.hide()
-
-        # connections
-        self.input.textChanged.connect(self.update_dropdown)
-        self.dropdown.itemClicked.connect(self.select_symbol)
-
         # arrow connections → ask parent to move row
         self.up_btn.clicked.connect(lambda: self.parent_widget.request_move(self, -1) if self.parent_widget else None)
         self.down_btn.clicked.connect(lambda: self.parent_widget.request_move(self, +1) if self.parent_widget else None)
 
-        # initialize button visibility
-        self.update_buttons(show_add=False)
+        self.apply_theme()
+        self.update_buttons(self._show_add)
+
+    def enterEvent(self, event):
+        self.build_controls()
+        super().enterEvent(event)
 
     def update_buttons(self, show_add):
         """Only show + on first empty row; show ✖ only when symbol exists."""
+        self._show_add = show_add
         empty = (self.symbol.text().strip() == "")
+        if self.up_btn is None:
+            if not (empty and show_add):
+                return
+            self.build_controls()  # the ➕ row needs its button without a hover
+            return
         self.remove_btn.setVisible(not empty)
         self.add_btn.setVisible(empty and show_add)
 
@@ -247,51 +627,53 @@ class PriceBox(QFrame):
             self.remove_callback(self)
 
     def start_add(self):
-        """Open input and show dropdown near it."""
-        self.add_btn.hide()
-        self.input.clear()
-        self.input.show()
-        self.input.setFocus()
-        self.update_dropdown()
-
-    def update_dropdown(self):
-        """Filter available symbols (from Excel rows) not already used."""
-        if not self.parent_widget:
-            return
-        all_syms = self.parent_widget.get_available_symbols_from_excel()
-        used = {b.symbol.text().strip() for b in self.parent_widget.boxes if b.symbol.text().strip()}
-        text = self.input.text().upper()
-        matches = [s for s in all_syms if (text in s.upper()) and (s not in used)]
-
-        self.dropdown.clear()
-        if matches:
-            for s in matches:
-                QListWidgetItem(s, self.dropdown)
-            # position dropdown under input
-            pos = self.input.mapToGlobal(self.input.rect().bottomLeft())
-            self.dropdown.move(pos)
-            # set width to input width
-            self.dropdown.setFixedWidth(self.input.width())
-            self.dropdown.show()
+        """Open the board's symbol picker in this row."""
+        if self.add_btn is not None:
+            self.add_btn.hide()
+        if self.parent_widget:
+            self.parent_widget.picker.attach(self)
+
+    def flash(self, name, color):
+        """Flash a price cell; the board's FlashClock fades it back."""
+        clock = getattr(self.parent_widget, "flash_clock", None)
+        if clock:
+            clock.flash(self, name, color)
         else:
-            self.dropdown.hide()
-
-    def select_symbol(self, item):
-        """Set selected symbol for this row and start live updating."""
-        self.symbol.setText(item.text())
-        self.input.hide()
-        self.dropdown.hide()
-        if self.add_callback:
-            self.add_callback(self)
-        self.update_buttons(show_add=False)
+            self.paint_flash(name, color, 0)
+
+    def paint_flash(self, name, color, step):
+        """Paint a price cell `step` levels into its fade (FLASH_STEPS = done)."""
+        dark = not self.parent_widget or self.parent_widget.is_darkmode
+        base = "white" if dark else "black"
+        cell = getattr(self, name)
+        if color is None or step >= FLASH_STEPS:
+            cell.setColor(base)
+            return
+        shade = _blend(color, base, step / FLASH_STEPS)
+        cell.setColor(shade, bold=(step < FLASH_STEPS // 2))
+
+    def load_symbol(self, symbol, quotes):
+        """Show `symbol` with its last known quote (no tick flash)."""
+        self.symbol.setText(symbol)
+        self.set_stale(False)
+        quote = quotes.get(symbol) if symbol else None
+        if not quote:
+            self.update_prices("", "", "", "")
+            return
+        try:
+            self.last_bid = float(quote[0])
+            self.last_ask = float(quote[1])
+        except (TypeError, ValueError):
+            pass
+        self.update_prices(*quote)
 
     def update_prices(self, bid, ask, low, high):
         try:
             bid = float(bid)
             if bid > self.last_bid:
-                self.bid.setStyleSheet("color: lime; font-size: 22pt; font-weight:bold;")
+                self.flash("bid", "lime")
             elif bid < self.last_bid:
-                self.bid.setStyleSheet("color: red; font-size: 22pt; font-weight:bold;")
+                self.flash("bid", "red")
             self.bid.setText(_fmt(bid))
             self.last_bid = bid
         except:
@@ -300,9 +682,9 @@ class PriceBox(QFrame):
         try:
             ask = float(ask)
             if ask > self.last_ask:
-                self.ask.setStyleSheet("color: lime; font-size: 22pt; font-weight:bold;")
+                self.flash("ask", "lime")
             elif ask < self.last_ask:
-                self.ask.setStyleSheet("color: red; font-size: 22pt; font-weight:bold;")
+                self.flash("ask", "red")
             self.ask.setText(_fmt(ask))
             self.last_ask = ask
         except:
@@ -317,24 +699,175 @@ class PriceBox(QFrame):
             bg_color = "#2f3338" if row_index % 2 == 1 else "#22272b"
         else:
             bg_color = "#f5f4e9" if row_index % 2 == 1 else "#f7f4e9"
-        self.setStyleSheet(f"QFrame {{ background-color: {bg_color}; border-radius: 5px;}}")
+        self.bg_color = bg_color
+        self.apply_frame_style()
+
+    def set_alert_highlight(self, on):
+        if self.alert_highlight != on:
+            self.alert_highlight = on
+            self.apply_frame_style()
+
+    def set_selected(self, on):
+        if self.selected != on:
+            self.selected = on
+            self.apply_frame_style()
+
+    def set_stale(self, on):
+        if self.stale != on:
+            self.stale = on
+            self.apply_frame_style()
+            self.paint_symbol()
+
+    def apply_frame_style(self):
+        style = "border-radius: 5px;"
+        if self.bg_color:
+            style = f"background-color: {self.bg_color}; " + style
+        if self.alert_highlight:
+            style += " border: 2px solid orange;"
+        elif self.selected:
+            style += " border: 2px solid #4a90d9;"
+        elif self.stale:
+            style += " border: 1px dashed #777;"
+        self.setStyleSheet(f"QFrame#row {{ {style} }}")
+
+    def paint_symbol(self):
+        """Symbol colour follows the theme; stale rows are dimmed."""
+        if self.stale:
+            color = "#777"
+        elif self.parent_widget and self.parent_widget.is_darkmode:
+            color = "white"
+        else:
+            color = "black"
+        self.symbol.setStyleSheet(f"color: {color}; font-size: 20pt;")
+
+    # --- selection / drag / context menu → handled by the board ---
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._press_pos = event.pos()
+            if self.parent_widget:
+                self.parent_widget.on_row_pressed(self, event.modifiers())
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if (self._press_pos is not None and event.buttons() & Qt.LeftButton
+                and (event.pos() - self._press_pos).manhattanLength() >= QApplication.startDragDistance()):
+            self._press_pos = None
+            if self.parent_widget:
+                self.parent_widget.start_drag(self)
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self._press_pos = None
+        super().mouseReleaseEvent(event)
+
+    def contextMenuEvent(self, event):
+        if self.parent_widget and self.symbol.text().strip():
+            self.parent_widget.show_row_menu(self, event.globalPos())
         
     def apply_theme(self):
         """Update text colors for labels based on current theme."""
         if self.parent_widget and self.parent_widget.is_darkmode:
             # Dark mode
-            self.symbol.setStyleSheet("color: white; font-size: 20pt;")
-            self.high.setStyleSheet("color: white; font-size: 22pt;")
-            self.low.setStyleSheet("color: white; font-size: 22pt;")
-            self.up_btn.setStyleSheet("color: gray; font-size: 18pt; background: transparent; border: none;")
-            self.down_btn.setStyleSheet("color: gray; font-size: 18pt; background: transparent; border: none;")
+            self.high.setColor("white")
+            self.low.setColor("white")
+            arrow_color = "gray"
         else:
             # Light mode
-            self.symbol.setStyleSheet("color: black; font-size: 20pt;")
-            self.high.setStyleSheet("color: black; font-size: 22pt;")
-            self.low.setStyleSheet("color: black; font-size: 22pt;")
-            self.up_btn.setStyleSheet("color: lightgray; font-size: 18pt; background: transparent; border: none;")
-            self.down_btn.setStyleSheet("color: lightgray; font-size: 18pt; background: transparent; border: none;")
+            self.high.setColor("black")
+            self.low.setColor("black")
+            arrow_color = "lightgray"
+        for btn in (self.up_btn, self.down_btn):
+            if btn is not None:
+                btn.setStyleSheet(f"color: {arrow_color}; font-size: 18pt; background: transparent; border: none;")
+        self.paint_symbol()
+        clock = getattr(self.parent_widget, "flash_clock", None)
+        for name in ("bid", "ask"):
+            if not clock or not clock.is_fading(self, name):
+                self.paint_flash(name, None, FLASH_STEPS)
+
+
+# -------------------------------
+# Symbol Picker (one per board)
+# -------------------------------
+class SymbolPicker:
+    """
+    The search field and dropdown used to add a symbol. There is one per
+    board; attach() moves the field into whichever row is being edited.
+    """
+    def __init__(self, board):
+        self.board = board  # MainWindow
+        self.box = None
+
+        self.input = QLineEdit()
+        self.input.setStyleSheet("font-size: 18pt;")
+        self.input.hide()
+
+        self.dropdown = QListWidget()
+        self.dropdown.setWindowFlags(Qt.Popup)
+        self.dropdown.setFocusPolicy(Qt.NoFocus)
+        self.dropdown.hide()
+
+        # connections
+        self.input.textChanged.connect(self.update_dropdown)
+        self.dropdown.itemClicked.connect(self.select_symbol)
+
+    def is_open(self):
+        return self.box is not None
+
+    def attach(self, box):
+        """Open input in `box` and show dropdown near it."""
+        if self.box is not None and self.box is not box:
+            self.close()
+        self.box = box
+        box.layout().addWidget(self.input, 2)
+        self.input.clear()
+        self.input.show()
+        self.input.setFocus()
+        self.update_dropdown()
+
+    def close(self):
+        self.dropdown.hide()
+        self.input.hide()
+        if self.box is not None:
+            self.box.layout().removeWidget(self.input)
+            self.box = None
+
+    def contains(self, global_pos):
+        if self.input.isVisible() and self.input.rect().contains(self.input.mapFromGlobal(global_pos)):
+            return True
+        return self.dropdown.isVisible() and self.dropdown.geometry().contains(global_pos)
+
+    def update_dropdown(self):
+        """Filter available symbols (from Excel rows) not already used."""
+        if self.box is None:
+            return
+        all_syms = self.board.get_available_symbols_from_excel()
+        used = set(self.board.active_symbols())
+        text = self.input.text().upper()
+        matches = [s for s in all_syms if (text in s.upper()) and (s not in used)]
+
+        self.dropdown.clear()
+        if matches:
+            for s in matches:
+                QListWidgetItem(s, self.dropdown)
+            # position dropdown under input
+            pos = self.input.mapToGlobal(self.input.rect().bottomLeft())
+            self.dropdown.move(pos)
+            # set width to input width
+            self.dropdown.setFixedWidth(self.input.width())
+            self.dropdown.show()
+        else:
+            self.dropdown.hide()
+
+    def select_symbol(self, item):
+        """Set selected symbol for the edited row and start live updating."""
+        box = self.box
+        self.close()
+        box.symbol.setText(item.text())
+        if box.add_callback:
+            box.add_callback(box)
+        box.update_buttons(show_add=False)
 
 
 # -------------------------------
@@ -347,6 +880,11 @@ class ExcelLiveSource:
         self.sheet = None
         self.path = path
         self.sheet_name = sheet_name
+        self.directory = {}  # symbol -> sheet row number
+        self.directory_version = 0
+        self.subscribed = None  # None = read the whole sheet
+        self._runs = None
+        self._reads_since_scan = 0
         self._open()
 
     def _open(self):
@@ -354,25 +892,94 @@ class ExcelLiveSource:
         self.wb = self.app.books.open(self.path)
         self.sheet = self.wb.sheets[self.sheet_name]
 
+    @staticmethod
+    def _symbol(value):
+        if not value or (isinstance(value, str) and value.strip().upper() in EXCLUDED):
+            return None
+        return str(value)
+
+    def _set_directory(self, directory):
+        if directory != self.directory:
+            self.directory = directory
+            self.directory_version += 1
+            self._runs = None
+        self._reads_since_scan = 0
+
+    def read_symbols(self):
+        """Scan the symbol column only and rebuild the symbol -> row directory."""
+        values = self.sheet.range(f"B{SHEET_FIRST_ROW}:B{SHEET_LAST_ROW}").value or []
+        directory = {}
+        for i, value in enumerate(values):
+            symbol = self._symbol(value)
+            if symbol:
+                directory.setdefault(symbol, SHEET_FIRST_ROW + i)
+        self._set_directory(directory)
+        return list(directory)
+
+    def subscribe(self, symbols):
+        """Restrict reads to `symbols` (None reads the whole sheet)."""
+        self.subscribed = None if symbols is None else set(symbols)
+        self._runs = None
+
+    def _read_runs(self):
+        """Group subscribed sheet rows into contiguous ranges, one COM read each."""
+        if self._runs is None:
+            wanted = sorted(self.directory[s] for s in self.subscribed if s in self.directory)
+            runs = []
+            for row in wanted:
+                if runs and row - runs[-1][1] <= READ_RUN_GAP:
+                    runs[-1][1] = row
+                else:
+                    runs.append([row, row])
+            self._runs = runs
+        return self._runs
+
+    @staticmethod
+    def _quote(symbol, row):
+        bid = row[1] if len(row) > 1 else ""
+        ask = row[2] if len(row) > 2 else ""
+        low = row[3] if len(row) > 3 else ""
+        high = row[4] if len(row) > 4 else ""
+        return (symbol, _fmt(bid), _fmt(ask), _fmt(low), _fmt(high))
+
     def read_rows(self):
+        if self.subscribed is None:
+            return self._read_all()
+        self._reads_since_scan += 1
+        if not self.directory or self._reads_since_scan >= DIRECTORY_RESCAN_READS:
+            self.read_symbols()
+        rows = []
+        seen = set()
+        for first, last in self._read_runs():
+            values = self.sheet.range(f"B{first}:F{last}").value
+            if first == last:
+                values = [values]
+            for row in values or []:
+                symbol = self._symbol(row[0]) if row else None
+                if symbol in self.subscribed and symbol not in seen:
+                    seen.add(symbol)
+                    rows.append(self._quote(symbol, row))
+        if len(seen) < sum(1 for s in self.subscribed if s in self.directory):
+            # rows were inserted/removed in the sheet: rescan on the next read
+            self._reads_since_scan = DIRECTORY_RESCAN_READS
+        return rows
+
+    def _read_all(self):
         # expected range: B2:F500 -> [Symbol, Bid, Ask, Low, High]
-        values = self.sheet.range("B2:F500").value
+        values = self.sheet.range(f"B{SHEET_FIRST_ROW}:F{SHEET_LAST_ROW}").value
         rows = []
         if not values:
             return rows
-        for row in values:
+        directory = {}
+        for i, row in enumerate(values):
             if not row:
                 continue
-            symbol = row[0]
-            if not symbol or (isinstance(symbol, str) and symbol.strip().upper() in EXCLUDED):
+            symbol = self._symbol(row[0])
+            if not symbol:
                 continue
-            bid = row[1] if len(row) > 1 else ""
-            ask = row[2] if len(row) > 2 else ""
-            low = row[3] if len(row) > 3 else ""
-            high = row[4] if len(row) > 4 else ""
-            
-            rows.append((str(symbol), _fmt(bid), _fmt(ask), _fmt(low), _fmt(high)))
-
+            directory.setdefault(symbol, SHEET_FIRST_ROW + i)
+            rows.append(self._quote(symbol, row))
+        self._set_directory(directory)
         return rows
 
     def close(self):
@@ -380,7 +987,962 @@ class ExcelLiveSource:
             if self.wb: self.wb.close()
         finally:
             if self.app: self.app.quit()
-            
+
+
+# -------------------------------
+# Symbol subscriptions
+# -------------------------------
+class SymbolSubscriptions:
+    """
+    Ref-counted union of the symbols that watchlists (and alerts) need.
+    The source only reads symbols with a count above zero.
+    """
+    def __init__(self, on_change=None):
+        self.counts = {}
+        self.on_change = on_change
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.symbols())
+
+    def acquire(self, symbol):
+        self.update((), (symbol,))
+
+    def release(self, symbol):
+        self.update((symbol,), ())
+
+    def update(self, old, new):
+        """Release symbols only in `old`, acquire symbols only in `new`."""
+        old, new = set(old), set(new)
+        changed = False
+        for symbol in new - old:
+            n = self.counts.get(symbol, 0)
+            self.counts[symbol] = n + 1
+            changed |= (n == 0)
+        for symbol in old - new:
+            n = self.counts.get(symbol, 0) - 1
+            if n <= 0:
+                self.counts.pop(symbol, None)
+                changed = True
+            else:
+                self.counts[symbol] = n
+        if changed:
+            self._changed()
+
+    def symbols(self):
+        return list(self.counts)
+
+
+# -------------------------------
+# Synthetic symbols
+# -------------------------------
+_FORMULA_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd,
+)
+
+
+def _compile_formula(expr):
+    """Parse a formula to (expression node, {variable: symbol}); only arithmetic is allowed."""
+    names = {}
+
+    def bracketed(m):
+        var = f"_s{len(names)}"
+        names[var] = m.group(1).strip()
+        return var
+
+    tree = ast.parse(re.sub(r"\[([^\]]+)\]", bracketed, expr), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _FORMULA_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(f"constant {node.value!r} is not a number")
+        if isinstance(node, ast.Name):
+            names.setdefault(node.id, node.id)
+    return tree.body, names
+
+
+def _interval(node, env):
+    """
+    Evaluate a formula over (bid, ask) intervals, returning (bid, ask).
+    A subtracted or divided leg uses its opposite side, so spreads and
+    ratios come out as an uncrossed quote (e.g. bid = a.bid - b.ask).
+    """
+    if isinstance(node, ast.Constant):
+        return float(node.value), float(node.value)
+    if isinstance(node, ast.Name):
+        return env[node.id]
+    if isinstance(node, ast.UnaryOp):
+        lo, hi = _interval(node.operand, env)
+        return (-hi, -lo) if isinstance(node.op, ast.USub) else (lo, hi)
+    alo, ahi = _interval(node.left, env)
+    blo, bhi = _interval(node.right, env)
+    op = node.op
+    if isinstance(op, ast.Add):
+        return alo + blo, ahi + bhi
+    if isinstance(op, ast.Sub):
+        return alo - bhi, ahi - blo
+    if isinstance(op, ast.Div):
+        if blo <= 0 <= bhi:
+            raise ZeroDivisionError("divisor quote spans zero")
+        corners = (alo / blo, alo / bhi, ahi / blo, ahi / bhi)
+    elif isinstance(op, ast.Mult):
+        corners = (alo * blo, alo * bhi, ahi * blo, ahi * bhi)
+    else:  # Pow
+        corners = (alo ** blo, alo ** bhi, ahi ** blo, ahi ** bhi)
+    return min(corners), max(corners)
+
+
+class SyntheticGraph:
+    """
+    Symbols computed from other symbols' quotes (cross rates, spreads,
+    baskets), evaluated over bid/ask intervals. Formulas may use other
+    synthetics; a base change recomputes only the synthetics downstream of
+    it, in topological order.
+    """
+    def __init__(self, formulas=None):
+        self.formulas = {}  # synthetic -> (expression node, {variable: symbol})
+        self.rank = {}  # synthetic -> position in topological order
+        self.dependents = {}  # symbol -> synthetics using it directly
+        self.values = {}  # symbol -> (bid, ask) floats
+        self.quotes = {}  # synthetic -> (bid, ask, low, high) strings
+        self.extremes = {}  # synthetic -> [session low, session high]
+        if formulas:
+            self.define(formulas)
+
+    def __contains__(self, symbol):
+        return symbol in self.formulas
+
+    def symbols(self):
+        return list(self.formulas)
+
+    def define(self, formulas):
+        """Compile {synthetic: expression}; bad or circular formulas are skipped."""
+        compiled = {}
+        for symbol, expr in formulas.items():
+            try:
+                compiled[symbol] = _compile_formula(expr)
+            except Exception as e:
+                print("Bad synthetic:", symbol, "=", expr, e)
+
+        users = {}
+        pending = {}
+        for symbol, (_, names) in compiled.items():
+            inputs = set(names.values())
+            pending[symbol] = len(inputs & compiled.keys())
+            for name in inputs:
+                users.setdefault(name, []).append(symbol)
+        order = [s for s, n in pending.items() if n == 0]
+        for symbol in order:  # grows while iterating (Kahn's algorithm)
+            for user in users.get(symbol, ()):
+                pending[user] -= 1
+                if pending[user] == 0:
+                    order.append(user)
+        for symbol in compiled.keys() - set(order):
+            print("Circular synthetic:", symbol, "=", formulas[symbol])
+
+        self.formulas = {s: compiled[s] for s in order}
+        self.rank = {s: i for i, s in enumerate(order)}
+        self.dependents = {}
+        for name, syms in users.items():
+            syms = [s for s in syms if s in self.rank]
+            if syms:
+                self.dependents[name] = syms
+        self.quotes = {}
+        self.extremes = {}
+
+    def bases(self, symbols):
+        """Sheet symbols needed to show `symbols` (plain symbols map to themselves)."""
+        out, seen = set(), set()
+        stack = list(symbols)
+        while stack:
+            symbol = stack.pop()
+            if symbol in seen:
+                continue
+            seen.add(symbol)
+            formula = self.formulas.get(symbol)
+            if formula is None:
+                out.add(symbol)
+            else:
+                stack.extend(formula[1].values())
+        return out
+
+    def _evaluate(self, node, names):
+        env = {}
+        for var, symbol in names.items():
+            bid, ask = self.values.get(symbol, (math.nan, math.nan))
+            if math.isnan(bid) or math.isnan(ask):
+                if math.isnan(bid) and math.isnan(ask):
+                    return math.nan, math.nan
+                bid = ask = ask if math.isnan(bid) else bid  # one-sided leg
+            env[var] = (bid, ask)
+        try:
+            return _interval(node, env)
+        except (ArithmeticError, TypeError, ValueError):  # x/0, complex powers
+            return math.nan, math.nan
+
+    def update(self, changed):
+        """
+        Feed changed sheet quotes {symbol: (bid, ask, low, high)}; returns
+        {synthetic: quote} for the synthetics whose quote changed.
+        """
+        stack = []
+        for symbol, quote in changed.items():
+            users = self.dependents.get(symbol)
+            if users and symbol not in self.formulas:
+                self.values[symbol] = (_num(quote[0]), _num(quote[1]))
+                stack.extend(users)
+        affected = set()
+        while stack:
+            symbol = stack.pop()
+            if symbol not in affected:
+                affected.add(symbol)
+                stack.extend(self.dependents.get(symbol, ()))
+
+        out = {}
+        for symbol in sorted(affected, key=self.rank.__getitem__):
+            bid, ask = self._evaluate(*self.formulas[symbol])
+            if not (math.isfinite(bid) and math.isfinite(ask)):
+                bid = ask = math.nan
+            self.values[symbol] = (bid, ask)
+            ext = self.extremes.get(symbol)
+            if math.isnan(bid):
+                quote = ("", "", "", "")
+            else:
+                if ext is None:
+                    ext = self.extremes[symbol] = [bid, bid]
+                ext[0], ext[1] = min(ext[0], bid), max(ext[1], bid)
+                quote = (_fmt(bid), _fmt(ask), _fmt(ext[0]), _fmt(ext[1]))
+            if self.quotes.get(symbol) != quote:
+                self.quotes[symbol] = quote
+                out[symbol] = quote
+        return out
+
+
+# -------------------------------
+# Columnar quote table
+# -------------------------------
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class QuoteTable:
+    """
+    Latest numeric quote per symbol in parallel arrays. A symbol keeps its
+    slot for the whole session, so slots can index other per-symbol arrays.
+    `live` flags the slots that are still being read; the others hold the
+    last price seen before their symbol was unsubscribed.
+    """
+    def __init__(self):
+        self.slots = {}  # symbol -> slot
+        self.symbols = []  # slot -> symbol
+        self.bid = array("d")
+        self.ask = array("d")
+        self.low = array("d")
+        self.high = array("d")
+        self.updated = array("d")  # time of last change (epoch seconds)
+        self.open = array("d")  # first valid mid of the session (movers baseline)
+        self.live = bytearray()  # slot -> 1 while its symbol is read
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def slot(self, symbol):
+        slot = self.slots.get(symbol)
+        if slot is None:
+            slot = len(self.symbols)
+            self.slots[symbol] = slot
+            self.symbols.append(symbol)
+            for col in (self.bid, self.ask, self.low, self.high, self.open):
+                col.append(math.nan)
+            self.updated.append(0.0)
+            self.live.append(1)
+        return slot
+
+    def set_live(self, symbols):
+        """Mark exactly the slots of `symbols` live; returns the slots that stopped being live."""
+        symbols = set(symbols)
+        dropped = []
+        for slot, symbol in enumerate(self.symbols):
+            live = symbol in symbols
+            if self.live[slot] and not live:
+                dropped.append(slot)
+            self.live[slot] = live
+        return dropped
+
+    def update(self, symbol, quote, now):
+        """Store a (bid, ask, low, high) quote; returns the symbol's slot."""
+        slot = self.slot(symbol)
+        bid, ask, low, high = quote
+        self.bid[slot] = _num(bid)
+        self.ask[slot] = _num(ask)
+        self.low[slot] = _num(low)
+        self.high[slot] = _num(high)
+        self.updated[slot] = now
+        self.live[slot] = 1
+        if math.isnan(self.open[slot]):
+            self.open[slot] = self.mid(slot)
+        return slot
+
+    def mid(self, slot):
+        bid, ask = self.bid[slot], self.ask[slot]
+        if math.isnan(ask):
+            return bid
+        if math.isnan(bid):
+            return ask
+        return (bid + ask) / 2
+
+
+# -------------------------------
+# Snapshot export
+# -------------------------------
+EXPORT_EXTENSIONS = {"csv": ".csv", "arrow": ".arrow", "parquet": ".parquet"}
+
+
+class SnapshotExporter:
+    """
+    Writes QuoteTable snapshots as CSV, Arrow IPC or Parquet on a worker
+    thread. The GUI thread only copies the column arrays; every file is
+    written to a temp file and renamed into place.
+    """
+    def __init__(self, quotes, folder=EXPORT_DIR, fmt=EXPORT_FORMAT):
+        self.quotes = quotes
+        self.folder = folder
+        self.format = fmt
+        self.last_error = None
+        self._jobs = queue.Queue()
+        self._worker = threading.Thread(target=self._write_loop, daemon=True)
+        self._worker.start()
+
+    def available(self, fmt=None):
+        fmt = fmt or self.format
+        return fmt == "csv" or (fmt in EXPORT_EXTENSIONS and pa is not None)
+
+    def snapshot(self):
+        """
+        Copy the quote columns of the live slots only, so symbols that are no
+        longer read never reach consumers as current quotes. With every slot
+        live this is one memcpy per column; otherwise itertools.compress
+        filters each column in C.
+        """
+        q = self.quotes
+        n = len(q)
+        live = q.live[:n]
+        if live.count(0):
+            return {
+                "symbol": list(compress(q.symbols[:n], live)),
+                "bid": array("d", compress(q.bid[:n], live)),
+                "ask": array("d", compress(q.ask[:n], live)),
+                "low": array("d", compress(q.low[:n], live)),
+                "high": array("d", compress(q.high[:n], live)),
+                "updated": array("d", compress(q.updated[:n], live)),
+            }
+        return {
+            "symbol": q.symbols[:n],
+            "bid": q.bid[:n],
+            "ask": q.ask[:n],
+            "low": q.low[:n],
+            "high": q.high[:n],
+            "updated": q.updated[:n],
+        }
+
+    def export(self, name="snapshot"):
+        """Queue a snapshot export to <folder>/<name>.<ext>; returns the path."""
+        if not self.available():
+            raise ValueError(f"export format '{self.format}' is not available (pyarrow missing?)")
+        path = os.path.join(self.folder, name + EXPORT_EXTENSIONS[self.format])
+        self._jobs.put((self.format, path, self.snapshot()))
+        return path
+
+    def close(self):
+        self._jobs.put(None)
+        self._worker.join(timeout=5)
+
+    def _write_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            fmt, path, columns = job
+            try:
+                _atomic_write(path, lambda f: self._write(fmt, f, columns))
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                print("Export error:", e)
+                traceback.print_exc()
+
+    @staticmethod
+    def _write(fmt, f, columns):
+        if fmt == "csv":
+            text = io.StringIO()
+            writer = csv.writer(text)
+            writer.writerow(list(columns))
+            writer.writerows(zip(*columns.values()))
+            f.write(text.getvalue().encode("utf-8"))
+            return
+        arrays = [pa.array(columns["symbol"], pa.string())]
+        for name in list(columns)[1:]:
+            col = columns[name]
+            arrays.append(pa.Array.from_buffers(pa.float64(), len(col), [None, pa.py_buffer(col)]))
+        table = pa.Table.from_arrays(arrays, names=list(columns))
+        if fmt == "parquet":
+            pa.parquet.write_table(table, f)
+        else:
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+
+
+# -------------------------------
+# OHLC bar aggregation
+# -------------------------------
+BAR_RECORD = struct.Struct("<qdddd")  # bar start (epoch s), open, high, low, close
+
+
+class _BarFrame:
+    """Open bar per quote-table slot for one timeframe, in flat arrays."""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start = array("q")  # -1 = no open bar
+        self.open = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.close = array("d")
+
+    def ensure(self, slots):
+        grow = slots - len(self.start)
+        if grow > 0:
+            self.start.extend([-1] * grow)
+            for col in (self.open, self.high, self.low, self.close):
+                col.extend([0.0] * grow)
+
+    def record(self, slot):
+        return BAR_RECORD.pack(self.start[slot], self.open[slot], self.high[slot],
+                               self.low[slot], self.close[slot])
+
+
+class BarAggregator:
+    """
+    Builds OHLC bars for every timeframe from the tick stream. Open bars
+    live in per-slot arrays; completed bars are buffered and appended to a
+    per-symbol, per-day file by a writer thread. Memory stays at one open
+    bar per symbol and timeframe plus one flush interval of completed bars.
+    """
+    def __init__(self, quotes, timeframes=BAR_TIMEFRAMES, root=BAR_DIR):
+        self.quotes = quotes
+        self.root = root
+        self.frames = [_BarFrame(tf) for tf in timeframes]
+        self.completed = {}  # (timeframe, slot) -> bytearray of records
+        self._queued = []  # batches handed to the writer, not yet on disk
+        self._io_lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def on_tick(self, slot, ts, price):
+        if math.isnan(price):
+            return
+        for frame in self.frames:
+            frame.ensure(slot + 1)
+            start = int(ts // frame.seconds) * frame.seconds
+            if frame.start[slot] != start:
+                if frame.start[slot] >= 0:
+                    self._complete(frame, slot)
+                frame.start[slot] = start
+                frame.open[slot] = frame.high[slot] = frame.low[slot] = price
+            elif price > frame.high[slot]:
+                frame.high[slot] = price
+            elif price < frame.low[slot]:
+                frame.low[slot] = price
+            frame.close[slot] = price
+
+    def _complete(self, frame, slot):
+        key = (frame.seconds, slot)
+        buf = self.completed.get(key)
+        if buf is None:
+            buf = self.completed[key] = bytearray()
+        buf += frame.record(slot)
+
+    def flush(self, now=None, partial=False):
+        """
+        Close bars whose period has ended (all open bars when `partial`) and
+        hand completed bars to the writer thread.
+        """
+        now = time.time() if now is None else now
+        for frame in self.frames:
+            for slot, start in enumerate(frame.start):
+                if start >= 0 and (partial or start + frame.seconds <= now):
+                    self._complete(frame, slot)
+                    frame.start[slot] = -1
+        if not self.completed:
+            return
+        batch = [(tf, self.quotes.symbols[slot], bytes(buf))
+                 for (tf, slot), buf in self.completed.items()]
+        self.completed = {}
+        with self._io_lock:
+            self._queued.append(batch)
+        self._jobs.put(batch)
+
+    def close(self):
+        self.flush(partial=True)
+        self._jobs.put(None)
+        self._writer.join(timeout=5)
+
+    def _path(self, symbol, timeframe, day):
+        return os.path.join(self.root, day, f"{timeframe}s", _quote_name(symbol, safe="") + ".bin")
+
+    @staticmethod
+    def _day(ts):
+        return time.strftime("%Y%m%d", time.localtime(ts))
+
+    def _write_loop(self):
+        while True:
+            batch = self._jobs.get()
+            if batch is None:
+                return
+            try:
+                with self._io_lock:
+                    for timeframe, symbol, data in batch:
+                        # a batch can straddle midnight: split records by day
+                        by_day = {}
+                        for off in range(0, len(data), BAR_RECORD.size):
+                            day = self._day(BAR_RECORD.unpack_from(data, off)[0])
+                            by_day.setdefault(day, bytearray()).extend(data[off:off + BAR_RECORD.size])
+                        for day, chunk in by_day.items():
+                            path = self._path(symbol, timeframe, day)
+                            os.makedirs(os.path.dirname(path), exist_ok=True)
+                            with open(path, "ab") as f:
+                                f.write(chunk)
+            except Exception as e:
+                print("Bar write error:", e)
+                traceback.print_exc()
+            finally:
+                # a failed batch is dropped, so a persistent disk error cannot grow _queued
+                with self._io_lock:
+                    self._queued.remove(batch)
+
+    def query(self, symbol, timeframe, start, end):
+        """
+        Bars for `symbol` with start <= bar start < end, as a list of
+        (start, open, high, low, close). Includes bars not yet on disk and
+        the currently open bar.
+        """
+        bars = {}
+        with self._io_lock:
+            # step calendar days, not 86400 s, so DST changes cannot skip a day file
+            day = date.fromtimestamp(start)
+            last = date.fromtimestamp(end)
+            while day <= last:
+                path = self._path(symbol, timeframe, day.strftime("%Y%m%d"))
+                day += timedelta(days=1)
+                if not os.path.exists(path):
+                    continue
+                with open(path, "rb") as f:
+                    self._collect_file(bars, f, start, end)
+            for batch in self._queued:
+                for tf, sym, data in batch:
+                    if tf == timeframe and sym == symbol:
+                        self._collect(bars, data, start, end)
+        slot = self.quotes.slots.get(symbol)
+        for frame in self.frames:
+            if frame.seconds != timeframe or slot is None or slot >= len(frame.start):
+                continue
+            buf = self.completed.get((timeframe, slot))
+            if buf:
+                self._collect(bars, bytes(buf), start, end)
+            if frame.start[slot] >= 0:
+                self._collect(bars, frame.record(slot), start, end)
+        return [bars[ts] for ts in sorted(bars)]
+
+    @staticmethod
+    def _seek_record(f, n, ts):
+        """Index of the first record in file `f` (n records) with bar start >= ts."""
+        size = BAR_RECORD.size
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid * size)
+            if BAR_RECORD.unpack(f.read(size))[0] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @classmethod
+    def _collect_file(cls, bars, f, start, end):
+        """Like _collect, but binary-searches the file and reads only the records in range."""
+        size = BAR_RECORD.size
+        n = f.seek(0, os.SEEK_END) // size
+        lo = cls._seek_record(f, n, start)
+        hi = cls._seek_record(f, n, end)
+        if lo < hi:
+            f.seek(lo * size)
+            cls._collect(bars, f.read((hi - lo) * size), start, end)
+
+    @staticmethod
+    def _collect(bars, data, start, end):
+        """Add records of `data` (sorted by start) in [start, end) to `bars`."""
+        size = BAR_RECORD.size
+        n = len(data) // size
+        lo, hi = 0, n
+        while lo < hi:  # first record with bar start >= start
+            mid = (lo + hi) // 2
+            if BAR_RECORD.unpack_from(data, mid * size)[0] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        for i in range(lo, n):
+            rec = BAR_RECORD.unpack_from(data, i * size)
+            if rec[0] >= end:
+                break
+            bars[rec[0]] = rec  # a later record for the same bar wins
+
+
+# -------------------------------
+# Stale quote tracking
+# -------------------------------
+class StalenessTracker:
+    """
+    Flags symbols whose quote has not changed within their interval. Uses
+    QuoteTable.updated as the last-change array and a deadline heap with at
+    most one entry per symbol, so a check only touches expired entries.
+    """
+    def __init__(self, quotes, default=STALE_AFTER_S, overrides=None):
+        self.quotes = quotes
+        self.default = default
+        self.overrides = dict(overrides or {})  # symbol -> seconds
+        self.heap = []  # (deadline, slot)
+        self.queued = set()  # slots with a heap entry
+        self.stale = set()  # stale slots
+
+    def interval(self, slot):
+        return self.overrides.get(self.quotes.symbols[slot], self.default)
+
+    def touch(self, slot):
+        """Call after a slot's quote changed; returns True if it was stale."""
+        if slot not in self.queued:
+            self.queued.add(slot)
+            heapq.heappush(self.heap, (self.quotes.updated[slot] + self.interval(slot), slot))
+        if slot in self.stale:
+            self.stale.discard(slot)
+            return True
+        return False
+
+    def check(self, now):
+        """Pop expired deadlines; returns the slots that just went stale."""
+        newly = []
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, slot = heapq.heappop(heap)
+            deadline = self.quotes.updated[slot] + self.interval(slot)
+            if deadline > now:
+                heapq.heappush(heap, (deadline, slot))  # changed since it was queued
+            else:
+                self.queued.discard(slot)
+                self.stale.add(slot)
+                newly.append(slot)
+        return newly
+
+
+# -------------------------------
+# Incremental rankings (live column sort, top movers)
+# -------------------------------
+class SortedSymbols:
+    """
+    Symbols kept in ascending order of a per-symbol sort key. An update is
+    one bisect removal and one bisect insert for the changed symbol only.
+    """
+    def __init__(self):
+        self.keys = {}  # symbol -> sort key
+        self.order = []  # sorted (key, symbol)
+
+    def reset(self, keys):
+        """Rank exactly the symbols of `keys` ({symbol: sort key})."""
+        self.keys = dict(keys)
+        self.order = sorted((k, s) for s, k in self.keys.items())
+
+    def __contains__(self, symbol):
+        return symbol in self.keys
+
+    def set(self, symbol, key):
+        """Re-rank one ranked symbol; returns True if its key changed."""
+        old = self.keys.get(symbol)
+        if old is None or key == old:
+            return False
+        i = bisect_left(self.order, (old, symbol))
+        if i < len(self.order) and self.order[i] == (old, symbol):
+            del self.order[i]
+        self.keys[symbol] = key
+        self.order.insert(bisect_left(self.order, (key, symbol)), (key, symbol))
+        return True
+
+    def top(self, k=None):
+        return [s for _, s in self.order[:k]]
+
+
+class MoverRanking(SortedSymbols):
+    """
+    Symbols ordered by how far they moved from their session-open price
+    (QuoteTable.open), largest move first.
+    """
+    def __init__(self, percent=False):
+        super().__init__()
+        self.percent = percent
+
+    def reset(self, symbols):
+        """Rank exactly `symbols` (scores kept for those already ranked)."""
+        super().reset({s: self.keys.get(s, 0.0) for s in symbols})
+
+    def score(self, symbol):
+        return -self.keys.get(symbol, 0.0)
+
+    def update(self, symbol, price, ref):
+        """Re-rank one symbol against its open price `ref`; returns True if its score changed."""
+        if symbol not in self.keys or math.isnan(price) or math.isnan(ref):
+            return False
+        move = abs(price - ref)
+        if self.percent:
+            move = move / abs(ref) * 100 if ref else 0.0
+        return self.set(symbol, -move)  # keys ascend, so the largest move ranks first
+
+
+# -------------------------------
+# Frame-coalesced rendering
+# -------------------------------
+class RenderCoalescer:
+    """
+    Ingest keeps only the latest quote per symbol; a capped-rate render
+    pass hands the whole pending set to apply_batch in one go.
+    """
+    def __init__(self, apply_batch, fps=RENDER_FPS):
+        self.apply_batch = apply_batch
+        self.pending = {}
+        self.ingested = 0  # quotes pushed
+        self.frames = 0  # render passes that applied something
+        self.applied = 0  # quotes actually rendered
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.flush)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        if not fps or fps <= 0:
+            screen = QApplication.primaryScreen()
+            fps = screen.refreshRate() if screen else 60
+        self.fps = fps
+        self.timer.setInterval(max(1, int(1000 / fps)))
+
+    def push(self, symbol, quote):
+        self.pending[symbol] = quote
+        self.ingested += 1
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def push_many(self, quotes):
+        for symbol, quote in quotes.items():
+            self.push(symbol, quote)
+
+    def flush(self):
+        if not self.pending:
+            self.timer.stop()  # idle until the next push
+            return
+        batch, self.pending = self.pending, {}
+        self.apply_batch(batch)
+        self.frames += 1
+        self.applied += len(batch)
+
+    def stop(self):
+        self.timer.stop()
+        self.pending = {}
+
+
+# -------------------------------
+# Tick flash animation clock
+# -------------------------------
+class FlashClock:
+    """
+    One board-wide timer for tick flashes. Only cells that are still fading
+    are stepped, and a cell is restyled only when its fade level changes.
+    The timer stops when nothing is fading.
+    """
+    def __init__(self, duration_ms=FLASH_MS):
+        self.duration = duration_ms / 1000.0
+        self.active = {}  # (box, name) -> [start, color, step]
+        self.timer = QTimer()
+        self.timer.setInterval(FLASH_TICK_MS)
+        self.timer.timeout.connect(self.step)
+
+    def flash(self, box, name, color):
+        self.active[(box, name)] = [time.monotonic(), color, 0]
+        box.paint_flash(name, color, 0)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def is_fading(self, box, name):
+        return (box, name) in self.active
+
+    def step(self):
+        now = time.monotonic()
+        done = []
+        for key, entry in self.active.items():
+            start, color, last = entry
+            level = int((now - start) / self.duration * FLASH_STEPS)
+            if level >= FLASH_STEPS:
+                done.append(key)
+                level = FLASH_STEPS
+            if level != last:
+                entry[2] = level
+                key[0].paint_flash(key[1], color, level)
+        for key in done:
+            del self.active[key]
+        if not self.active:
+            self.timer.stop()
+
+    def stop(self):
+        self.timer.stop()
+        self.active = {}
+
+
+# -------------------------------
+# Price Alerts
+# -------------------------------
+class Alert:
+    def __init__(self, symbol, field, direction, level, hysteresis=0.0, cooldown=0.0):
+        if field not in ("bid", "ask", "spread"):
+            raise ValueError(f"unknown alert field: {field}")
+        if direction not in ("above", "below"):
+            raise ValueError(f"unknown alert direction: {direction}")
+        self.symbol = symbol
+        self.field = field
+        self.direction = direction
+        self.level = level
+        self.hysteresis = abs(hysteresis)
+        self.cooldown = cooldown
+        self.armed = True
+        self.last_fired = None
+
+    def describe(self):
+        return f"{self.symbol} {self.field} {self.direction} {_fmt(self.level)}"
+
+
+class _AlertIndex:
+    """
+    Sorted thresholds for one (symbol, field). Every alert has two entries:
+    its trigger level and its re-arm level (trigger -/+ hysteresis).
+    """
+    def __init__(self):
+        self.levels = []
+        self.entries = []  # (alert, is_trigger), parallel to levels
+        self.last = None
+
+    def add(self, alert):
+        if alert.direction == "above":
+            rearm = alert.level - alert.hysteresis
+        else:
+            rearm = alert.level + alert.hysteresis
+        for level, is_trigger in ((alert.level, True), (rearm, False)):
+            i = bisect_right(self.levels, level)
+            self.levels.insert(i, level)
+            self.entries.insert(i, (alert, is_trigger))
+
+    def remove(self, alert):
+        keep = [(l, e) for l, e in zip(self.levels, self.entries) if e[0] is not alert]
+        self.levels = [l for l, _ in keep]
+        self.entries = [e for _, e in keep]
+
+    def crossed(self, prev, new):
+        """Entries whose level lies between prev and new, in crossing order."""
+        if new > prev:
+            lo = bisect_right(self.levels, prev)
+            hi = bisect_right(self.levels, new)
+            return True, self.entries[lo:hi]
+        if new < prev:
+            lo = bisect_left(self.levels, new)
+            hi = bisect_left(self.levels, prev)
+            return False, self.entries[lo:hi][::-1]
+        return None, ()
+
+
+class AlertEngine:
+    """
+    Threshold-crossing detection fed by changed quotes. Each update only
+    visits the levels between the previous and the new value.
+    """
+    def __init__(self, alerts=()):
+        self._index = {}  # symbol -> {field: _AlertIndex}
+        for alert in alerts:
+            self.add(alert)
+
+    def add(self, alert):
+        fields = self._index.setdefault(alert.symbol, {})
+        fields.setdefault(alert.field, _AlertIndex()).add(alert)
+
+    def remove(self, alert):
+        idx = self._index.get(alert.symbol, {}).get(alert.field)
+        if idx:
+            idx.remove(alert)
+
+    def symbols(self):
+        return list(self._index.keys())
+
+    def on_quote(self, symbol, bid, ask, now=None):
+        """Feed one changed quote; returns a list of (time, alert, value) fired."""
+        fields = self._index.get(symbol)
+        if not fields:
+            return []
+        now = time.time() if now is None else now
+        fired = []
+        for field, idx in fields.items():
+            try:
+                if field == "bid":
+                    value = float(bid)
+                elif field == "ask":
+                    value = float(ask)
+                else:
+                    value = float(ask) - float(bid)
+            except (TypeError, ValueError):
+                continue
+            prev, idx.last = idx.last, value
+            if prev is None:
+                continue
+            rising, entries = idx.crossed(prev, value)
+            for alert, is_trigger in entries:
+                fires_up = (alert.direction == "above")
+                if is_trigger and fires_up == rising:
+                    if not alert.armed:
+                        continue
+                    if alert.last_fired is not None and now - alert.last_fired < alert.cooldown:
+                        continue
+                    alert.armed = False
+                    alert.last_fired = now
+                    fired.append((now, alert, value))
+                elif not is_trigger and fires_up != rising:
+                    alert.armed = True
+        return fired
+
+
+# -------------------------------
+# Alert Log Window
+# -------------------------------
+class AlertLog(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Alerts")
+        self.resize(500, 300)
+
+        layout = QVBoxLayout(self)
+        self.list = QListWidget()
+        layout.addWidget(self.list)
+
+    def add_events(self, events):
+        for ts, alert, value in events:
+            stamp = time.strftime("%H:%M:%S", time.localtime(ts))
+            self.list.insertItem(0, f"{stamp}  {alert.describe()}  ({_fmt(value)})")
+        while self.list.count() > ALERT_LOG_MAX:
+            self.list.takeItem(self.list.count() - 1)
+
 # -------------------------------
 # Font Delegate for preview
 # -------------------------------
@@ -432,6 +1994,7 @@ class FontChanger(QWidget):
         font = QFont(font_name, 10)
         self.main_window.current_font = font
         self.main_window.apply_font_to_widgets()
+        self.main_window.schedule_save()
         QApplication.setFont(font)
         self.close()            
             
@@ -440,7 +2003,8 @@ class FontChanger(QWidget):
 # Main Window
 # -------------------------------
 class MainWindow(QWidget):
-    def __init__(self, file_path, sheet_name):
+    def __init__(self, file_path, sheet_name, refresh_ms=REFRESH_INTERVAL_MS, render_fps=RENDER_FPS,
+                 stale_overrides=None):
         super().__init__()
         self.setWindowTitle("Live Prices")
         self.setStyleSheet("background-color: black;")
@@ -456,6 +2020,12 @@ class MainWindow(QWidget):
         main.setContentsMargins(5,5,5,5)
         main.setSpacing(5)
 
+        # Watchlist tabs: one board, refilled from the selected list
+        self.tabs = QTabBar()
+        self.tabs.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tabs.customContextMenuRequested.connect(self.show_tab_menu)
+        main.addWidget(self.tabs)
+
         # Fixed header (kept)
         self.header_frame = QFrame()
         self.header_frame.setStyleSheet("background-color:#111;")
@@ -463,6 +2033,9 @@ class MainWindow(QWidget):
         hl.setContentsMargins(10,8,10,8)
         hl.setSpacing(12)
         headers = ["Symbol","Bid","Ask","Low","High"]
+        self.header_labels = {}
+        self.sort_column = None
+        self.sort_descending = False
         for i, h in enumerate(headers):
             lbl = QLabel(h)
             if self.is_darkmode:
@@ -474,8 +2047,20 @@ class MainWindow(QWidget):
             
             if h.lower() == "symbol":
                 self.header_symbol_lbl = lbl
+
+            # click a column header to sort the board by it
+            lbl.setProperty("column", h.lower())
+            lbl.setCursor(Qt.PointingHandCursor)
+            lbl.installEventFilter(self)
+            self.header_labels[h.lower()] = lbl
             
             hl.addWidget(lbl, 1)
+        self.status_lbl = QLabel("")
+        self.status_lbl.setStyleSheet("color: gray; font-size: 11pt;")
+        hl.addWidget(self.status_lbl)
+        self.stale_lbl = QLabel("")
+        self.stale_lbl.setStyleSheet("color: #c90; font-size: 11pt;")
+        hl.addWidget(self.stale_lbl)
         spacer = QFrame()
         spacer.setFixedWidth(5)  # space for ↑/↓ and ✖/➕
         hl.addWidget(spacer)
@@ -501,27 +2086,105 @@ class MainWindow(QWidget):
             QMessageBox.critical(self, "Excel Error", f"Failed to open Excel file/sheet.\n\n{e}")
             raise
 
-        # Boxes + state
+        # Synthetic symbols are computed from sheet rows; subscribing to one
+        # makes the source read its bases instead
+        self.synthetics = SyntheticGraph(load_synthetics())
+
+        # Watchlists: name -> symbols; the active list lives in self.boxes.
+        # Every list holds a ref on its symbols so the source reads their union.
+        self.subscriptions = SymbolSubscriptions(self.on_subscriptions_changed)
+        self.watchlists = {DEFAULT_WATCHLIST: []}
+        self.active_watchlist = DEFAULT_WATCHLIST
+        self._watch_refs = {DEFAULT_WATCHLIST: set()}
+        self.tabs.addTab(DEFAULT_WATCHLIST)
+        self.tabs.currentChanged.connect(self.switch_watchlist)
+
+        # Boxes + state (rows share one symbol picker)
+        self.picker = SymbolPicker(self)
         self.boxes = []
+        self.row_by_symbol = {}  # symbol -> row showing it (kept by index_rows)
         for i in range(MAX_BOXES):
-            box = PriceBox(
-                row_index=i,
-                remove_callback=self.on_row_cleared,
-                add_callback=self.on_row_added,
-                parent_widget=self
-            )
-            self.rows_layout.addWidget(box)
-            self.boxes.append(box)
+            self.add_box()
 
         self._anim_group = None  # keep reference to animations
+        self.selection = []  # rows picked with Ctrl+click, in click order
+        self._drag_rows = []
+
+        # Rows can be dropped anywhere on the board
+        self.rows_container.setAcceptDrops(True)
+        self.rows_container.installEventFilter(self)
+
+        # Settings are persisted shortly after the last change, off the GUI thread
+        self.settings_writer = SettingsWriter()
+        self.save_timer = QTimer()
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DEBOUNCE_MS)
+        self.save_timer.timeout.connect(self.save_settings)
 
         self.initial_fill_done = False
         self.last_rows_dict = {}  # symbol -> (bid, ask, low, high) strings
 
+        # Price alerts (fired events are dispatched outside refresh_once)
+        self.alerts = AlertEngine(load_alerts())
+        self.alert_log = AlertLog()
+        self._pending_alerts = []
+        self.alert_until = {}  # symbol -> monotonic time its row highlight ends
+        self.alert_timer = QTimer()
+        self.alert_timer.setSingleShot(True)
+        self.alert_timer.timeout.connect(self.update_alert_highlights)
+        self._directory_version = None
+        self.movers = None  # MoverRanking while "top movers" mode is on
+        self.manual_order = None  # the user's row order while movers mode or a sort drives the board
+        self.sorter = None  # SortedSymbols while the board is kept sorted by a column
+        self._sort_dirty = False
+        self._stale_count_dirty = False
+        self._movers_dirty = False
+
+        # Numeric quote table and intraday OHLC bars built from it
+        self.quotes = QuoteTable()
+        self.bars = BarAggregator(self.quotes)
+        self.bar_timer = QTimer()
+        self.bar_timer.timeout.connect(self.bars.flush)
+        self.bar_timer.start(BAR_FLUSH_MS)
+
+        # Shared-memory quote table for other local processes
+        self.publisher = None
+        if SHM_ENABLED:
+            try:
+                self.publisher = QuoteTableWriter(SHM_NAME)
+            except Exception as e:
+                print("Shared memory disabled:", e)
+
+        # Stale quotes: deadline heap checked once a second
+        # (per-symbol intervals must be known before the first read queues deadlines)
+        self.staleness = StalenessTracker(self.quotes, overrides=stale_overrides)
+        self.stale_timer = QTimer()
+        self.stale_timer.timeout.connect(self.check_stale)
+        if self.publisher:
+            # shared-memory readers treat a silent writer as gone
+            self.stale_timer.timeout.connect(self.publisher.beat)
+        self.stale_timer.start(STALE_CHECK_MS)
+
+        # Snapshot export: scheduled (export_timer) and on Ctrl+Shift+E
+        self.exporter = SnapshotExporter(self.quotes)
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.export_scheduled)
+        self.set_export_interval(EXPORT_INTERVAL_S)
+
+        # Ingest (refresh_once) and render (apply_quotes) run at independent rates
+        self.flash_clock = FlashClock()
+        self.reads = 0
+        self.ingest_rate = self.quote_rate = self.frame_rate = 0.0
+        self.render = RenderCoalescer(self.apply_quotes, render_fps)
+        self._last_stats = (time.monotonic(), 0, 0, 0)
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_rate_stats)
+        self.stats_timer.start(1000)
+
         self.refresh_once()
         self.timer = QTimer()
         self.timer.timeout.connect(self.refresh_once)
-        self.timer.start(REFRESH_INTERVAL_MS)
+        self.timer.start(refresh_ms)
 
         self.is_fullscreen = False
         shortcut = QShortcut(QKeySequence("Ctrl+Shift+F1"), self)
@@ -542,6 +2205,28 @@ class MainWindow(QWidget):
         # Shortcut to open Font Changer
         self.font_shortcut = QShortcut(QKeySequence("Ctrl+Shift+F"), self)
         self.font_shortcut.activated.connect(self.open_font_changer)
+
+        # Move selected rows to the top / bottom
+        self.top_shortcut = QShortcut(QKeySequence("Ctrl+Home"), self)
+        self.top_shortcut.activated.connect(lambda: self.move_rows(self.selection, 0))
+        self.bottom_shortcut = QShortcut(QKeySequence("Ctrl+End"), self)
+        self.bottom_shortcut.activated.connect(lambda: self.move_rows(self.selection, len(self.boxes)))
+
+        # Top movers mode: off → absolute → percent → off
+        self.movers_shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), self)
+        self.movers_shortcut.activated.connect(self.cycle_movers_mode)
+
+        # Widget count (rows build their buttons lazily)
+        self.stats_shortcut = QShortcut(QKeySequence("Ctrl+Shift+W"), self)
+        self.stats_shortcut.activated.connect(self.show_widget_stats)
+
+        # Shortcut to export a snapshot now
+        self.export_shortcut = QShortcut(QKeySequence("Ctrl+Shift+E"), self)
+        self.export_shortcut.activated.connect(self.export_now)
+
+        # Shortcut to open the alert log
+        self.alert_shortcut = QShortcut(QKeySequence("Ctrl+Shift+A"), self)
+        self.alert_shortcut.activated.connect(self.alert_log.show)
         
         
         # put it last , 
@@ -551,53 +2236,328 @@ class MainWindow(QWidget):
 
     # --- New helpers for +/search ---
     def get_available_symbols_from_excel(self):
-        """Return list of symbols present in Excel (from last read)."""
-        return list(self.last_rows_dict.keys())
+        """Return symbols present in Excel (from the last symbol scan) plus synthetics."""
+        directory = self.source.directory
+        return list(directory) + [s for s in self.synthetics.symbols() if s not in directory]
+
+    def add_box(self):
+        box = PriceBox(
+            row_index=len(self.boxes),
+            remove_callback=self.on_row_cleared,
+            add_callback=self.on_row_added,
+            parent_widget=self
+        )
+        for cell in (box.bid, box.ask, box.high, box.low):
+            cell.setFont(self.current_font)
+        self.rows_layout.addWidget(box)
+        self.boxes.append(box)
+        return box
+
+    # --- Watchlists ---
+    def active_symbols(self):
+        return [b.symbol.text().strip() for b in self.boxes if b.symbol.text().strip()]
+
+    def index_rows(self):
+        """Rebuild the symbol -> row lookup after rows were filled, cleared or moved."""
+        self.row_by_symbol = {}
+        for b in self.boxes:
+            sym = b.symbol.text().strip()
+            if sym:
+                self.row_by_symbol[sym] = b
+
+    def sync_watchlist(self):
+        """Store the active board into its watchlist and update subscriptions."""
+        name = self.active_watchlist
+        symbols = self.active_symbols()
+        if self.manual_order is not None:
+            # movers mode owns the on-screen order; store the user's order instead
+            present = set(symbols)
+            kept = [s for s in self.manual_order if s in present]
+            known = set(kept)
+            symbols = self.manual_order = kept + [s for s in symbols if s not in known]
+        self.watchlists[name] = symbols
+        self.set_watch_refs(name, symbols)
+        if self.movers and set(symbols) != set(self.movers.keys):
+            self.reset_movers()
+        if self.sorter and set(symbols) != set(self.sorter.keys):
+            self.reset_sort()
+
+    def on_subscriptions_changed(self, symbols):
+        """Read what the subscribed symbols need; everything else stops being live."""
+        bases = self.synthetics.bases(symbols)
+        self.source.subscribe(bases)
+        for slot in self.quotes.set_live(bases | set(symbols)):
+            if self.publisher:
+                self.publisher.deactivate(slot)
+
+    def set_watch_refs(self, name, symbols):
+        symbols = set(symbols)
+        old = self._watch_refs.get(name, set())
+        if symbols != old:
+            self._watch_refs[name] = symbols
+            self.subscriptions.update(old, symbols)
+
+    def set_watchlists(self, watchlists, active=None):
+        """Replace all watchlists (e.g. from config) and show `active`."""
+        if not watchlists:
+            return
+        for name in list(self._watch_refs):
+            self.set_watch_refs(name, ())
+        self._watch_refs = {}
+        self.watchlists = {name: list(symbols) for name, symbols in watchlists.items()}
+        for name, symbols in self.watchlists.items():
+            self.set_watch_refs(name, symbols)
+        if active not in self.watchlists:
+            active = next(iter(self.watchlists))
+        self.tabs.blockSignals(True)
+        while self.tabs.count():
+            self.tabs.removeTab(0)
+        for name in self.watchlists:
+            self.tabs.addTab(name)
+        self.tabs.setCurrentIndex(list(self.watchlists).index(active))
+        self.tabs.blockSignals(False)
+        self.active_watchlist = active
+        self.load_board(self.watchlists[active])
+
+    def load_board(self, symbols):
+        """Fill the board with `symbols`; leftover rows are cleared."""
+        if self.manual_order is not None:
+            self.manual_order = list(symbols)
+        self.clear_selection()
+        self.picker.close()
+        while len(self.boxes) < len(symbols):
+            self.add_box().symbol.setFixedWidth(int(self.width() * 0.3))
+        for i, box in enumerate(self.boxes):
+            box.load_symbol(symbols[i] if i < len(symbols) else "", self.last_rows_dict)
+            slot = self.quotes.slots.get(box.symbol.text().strip())
+            if slot is not None and slot in self.staleness.stale:
+                box.set_stale(True)
+        self.index_rows()
+        if self.alert_until:
+            self.update_alert_highlights()
+        self.reset_sort()
+        self.update_add_buttons()
+
+    def switch_watchlist(self, index):
+        name = self.tabs.tabText(index)
+        if name not in self.watchlists or name == self.active_watchlist:
+            return
+        if self.active_watchlist is not None:
+            self.sync_watchlist()
+        self.active_watchlist = name
+        self.load_board(self.watchlists[name])
+        self.reset_movers()
+        self.schedule_save()
+
+    def new_watchlist(self):
+        name, ok = QInputDialog.getText(self, "New watchlist", "Name:")
+        name = name.strip()
+        if not ok or not name or name in self.watchlists or "=" in name:
+            return
+        self.watchlists[name] = []
+        self._watch_refs[name] = set()
+        self.tabs.setCurrentIndex(self.tabs.addTab(name))
+
+    def rename_watchlist(self, index):
+        old = self.tabs.tabText(index)
+        name, ok = QInputDialog.getText(self, "Rename watchlist", "Name:", text=old)
+        name = name.strip()
+        if not ok or not name or name in self.watchlists or "=" in name:
+            return
+        self.watchlists = {(name if k == old else k): v for k, v in self.watchlists.items()}
+        self._watch_refs[name] = self._watch_refs.pop(old, set())
+        if self.active_watchlist == old:
+            self.active_watchlist = name
+        self.tabs.setTabText(index, name)
+        self.schedule_save()
+
+    def delete_watchlist(self, index):
+        if self.tabs.count() <= 1:
+            return
+        name = self.tabs.tabText(index)
+        self.set_watch_refs(name, ())
+        self._watch_refs.pop(name, None)
+        self.watchlists.pop(name, None)
+        if name == self.active_watchlist:
+            self.active_watchlist = None  # nothing to sync back on switch
+        self.tabs.removeTab(index)  # emits currentChanged → switch_watchlist
+        if self.active_watchlist is None:
+            self.active_watchlist = self.tabs.tabText(self.tabs.currentIndex())
+            self.load_board(self.watchlists[self.active_watchlist])
+        self.schedule_save()
+
+    def show_tab_menu(self, pos):
+        index = self.tabs.tabAt(pos)
+        menu = QMenu(self)
+        new_action = menu.addAction("New watchlist…")
+        rename_action = menu.addAction("Rename…") if index >= 0 else None
+        delete_action = menu.addAction("Delete") if index >= 0 and self.tabs.count() > 1 else None
+        chosen = menu.exec_(self.tabs.mapToGlobal(pos))
+        if chosen is None:
+            return
+        if chosen is new_action:
+            self.new_watchlist()
+        elif chosen is rename_action:
+            self.rename_watchlist(index)
+        elif chosen is delete_action:
+            self.delete_watchlist(index)
 
 
     def resizeEvent(self, event):
                 super().resizeEvent(event)
+                width = int(self.width() * 0.3)
+                if width == getattr(self, "_symbol_width", None):
+                    return  # height-only resize: nothing to re-fix
+                self._symbol_width = width
                 for box in self.boxes:
                     # Make the symbol label 30% of the MainWindow width
-                    box.symbol.setFixedWidth(int(self.width() * 0.3))
+                    box.symbol.setFixedWidth(width)
                 if self.header_symbol_lbl:
-                    self.header_symbol_lbl.setFixedWidth(int(self.width() * 0.3))
+                    self.header_symbol_lbl.setFixedWidth(width)
                 
 
     def on_row_cleared(self, _box):
         """Callback when a PriceBox clears itself (user clicked ✖)."""
         _box.symbol.setText("")
         _box.update_prices("", "", "", "")
-        _box.input.hide()
-        _box.dropdown.hide()
+        if self.picker.box is _box:
+            self.picker.close()
+        if _box in self.selection:
+            self.selection.remove(_box)
+            _box.set_selected(False)
         self.reorder_boxes()
+        self.index_rows()
+        if self.alert_until:
+            self.update_alert_highlights()
         self.update_add_buttons()
+        self.sync_watchlist()
+        self.schedule_save()
 
     def on_row_added(self, _box):
         """Callback when a symbol is chosen from the dropdown for a box."""
-        _box.input.hide()
-        _box.dropdown.hide()
+        sym = _box.symbol.text().strip()
+        if sym in self.last_rows_dict:
+            self.render.push(sym, self.last_rows_dict[sym])
         self.reorder_boxes()
+        self.index_rows()
+        if self.alert_until:
+            self.update_alert_highlights()
         self.update_add_buttons()
+        self.sync_watchlist()
+        self.schedule_save()
 
     def reorder_boxes(self):
         """
         Keep current relative order of active rows; move empty rows below them.
+        Only empty rows sitting above an active row are moved.
         """
-        active = [b for b in self.boxes if b.symbol.text().strip() != ""]
-        empty = [b for b in self.boxes if b.symbol.text().strip() == ""]
-        ordered = active + empty
-
-        # Remove & re-add into layout in the new order
-        for b in self.boxes:
-            try:
-                self.rows_layout.removeWidget(b)
-            except Exception:
-                pass
-        for i, b in enumerate(ordered):
-            self.rows_layout.insertWidget(i, b)
-            b.show()
-        self.boxes = ordered
+        last_active = -1
+        for i, b in enumerate(self.boxes):
+            if b.symbol.text().strip():
+                last_active = i
+        stray = [b for b in self.boxes[:last_active] if not b.symbol.text().strip()]
+        if stray:
+            self.move_rows(stray, len(self.boxes), save=False)
+
+    def active_row_count(self):
+        return sum(1 for b in self.boxes if b.symbol.text().strip())
+
+    def move_rows(self, rows, index, save=True):
+        """
+        Move `rows` (keeping their board order) so the first one lands at
+        `index`. Only the moved widgets are taken out of / put back into
+        the layout; active rows stay above empty ones.
+        """
+        rows = sorted(set(rows) & set(self.boxes), key=self.boxes.index)
+        if not rows:
+            return
+        if save:
+            self.clear_sort(keep_order=True)  # a manual move ends the live sort
+        for b in rows:
+            self.boxes.remove(b)
+            self.rows_layout.removeWidget(b)
+        if all(b.symbol.text().strip() for b in rows):
+            index = min(index, self.active_row_count())
+        index = max(0, min(index, len(self.boxes)))
+        for offset, b in enumerate(rows):
+            self.boxes.insert(index + offset, b)
+            self.rows_layout.insertWidget(index + offset, b)
+        self.index_rows()
+        if save:
+            self.update_add_buttons()
+            self.schedule_save()
+
+    # --- Selection, drag & drop and row menu ---
+    def on_row_pressed(self, box, modifiers):
+        """Ctrl+click toggles a row in the selection; a plain click clears it."""
+        if modifiers & Qt.ControlModifier:
+            if box in self.selection:
+                self.selection.remove(box)
+                box.set_selected(False)
+            elif box.symbol.text().strip():
+                self.selection.append(box)
+                box.set_selected(True)
+        elif box not in self.selection:
+            self.clear_selection()
+
+    def clear_selection(self):
+        for b in self.selection:
+            b.set_selected(False)
+        self.selection = []
+
+    def start_drag(self, box):
+        rows = self.selection if box in self.selection else [box]
+        rows = [b for b in rows if b.symbol.text().strip()]
+        if not rows:
+            return
+        mime = QMimeData()
+        mime.setData(ROW_MIME, b"")
+        drag = QDrag(box)
+        drag.setMimeData(mime)
+        drag.setPixmap(box.grab())  # only the row under the cursor is rendered
+        drag.setHotSpot(QPoint(10, box.height() // 2))
+        self._drag_rows = rows
+        try:
+            drag.exec_(Qt.MoveAction)
+        finally:
+            self._drag_rows = []
+
+    def row_index_at(self, y):
+        """Board index a drop at container y-coordinate `y` should insert before."""
+        for i, b in enumerate(self.boxes):
+            if y < b.y() + b.height() // 2:
+                return i
+        return len(self.boxes)
+
+    def drop_rows(self, y):
+        index = self.row_index_at(y)
+        # index counts the dragged rows above the drop point; they are removed first
+        index -= sum(1 for b in self._drag_rows if self.boxes.index(b) < index)
+        self.move_rows(self._drag_rows, index)
+
+    def show_row_menu(self, box, global_pos):
+        rows = self.selection if box in self.selection else [box]
+        menu = QMenu(self)
+        to_top = menu.addAction("Move to top")
+        to_bottom = menu.addAction("Move to bottom")
+        to_index = menu.addAction("Move to row…")
+        chosen = menu.exec_(global_pos)
+        if chosen is to_top:
+            self.move_rows(rows, 0)
+        elif chosen is to_bottom:
+            self.move_rows(rows, len(self.boxes))
+        elif chosen is to_index:
+            count = self.active_row_count()
+            row, ok = QInputDialog.getInt(self, "Move rows", "Row number:",
+                                          self.boxes.index(box) + 1, 1, max(1, count))
+            if ok:
+                self.move_rows(rows, row - 1)
+        if rows and rows[0] in self.boxes:
+            self.scroll.ensureWidgetVisible(rows[0])
+
+    def schedule_save(self):
+        """Persist settings shortly after the last change (debounced)."""
+        self.save_timer.start()
 
     def apply_theme(self):
         if self.is_darkmode:
@@ -610,8 +2570,10 @@ class MainWindow(QWidget):
             self.header_frame.setStyleSheet("background-color: white;")
             header_color = "black"
             
-        for lbl in self.header_frame.findChildren(QLabel):
+        for lbl in self.header_labels.values():
             lbl.setStyleSheet(f"color: {header_color}; font-weight: bold; font-size: 18pt")
+        self.tabs.setStyleSheet(f"QTabBar::tab {{ color: {header_color}; font-size: 12pt; padding: 4px 12px; }}"
+                                f"QTabBar::tab:selected {{ border-bottom: 2px solid {header_color}; }}")
 
             
             
@@ -629,6 +2591,7 @@ class MainWindow(QWidget):
         for i, box in enumerate(self.boxes):
             box.update_background(i)
             box.apply_theme()
+        self.schedule_save()
     
     
     def update_add_buttons(self):
@@ -644,16 +2607,8 @@ class MainWindow(QWidget):
         empty_boxes = [b for b in self.boxes if not b.symbol.text().strip()]
         if remaining and not empty_boxes:
             # create a new empty row at the bottom
-            b = PriceBox(
-                symbol="",
-                row_index=len(self.boxes),
-                remove_callback=self.on_row_cleared,
-                add_callback=self.on_row_added,
-                parent_widget=self
-            )
+            b = self.add_box()
             b.symbol.setFixedWidth(int(self.width() * 0.3))
-            self.boxes.append(b)
-            self.rows_layout.addWidget(b)
             empty_boxes = [b]
 
         # show ➕ only on the first empty row
@@ -665,8 +2620,9 @@ class MainWindow(QWidget):
     # --- Smooth visual row swap on arrow click ---
     def request_move(self, box, direction):
         """
-        Smoothly swap 'box' with its neighbor using ghost overlays inside
-        the scroll viewport, then reinsert widgets in the new order.
+        Swap 'box' with its neighbor. When both rows are on screen the swap
+        is animated with ghost overlays inside the scroll viewport; only the
+        two rows are then moved in the layout.
         """
         try:
             idx = self.boxes.index(box)
@@ -678,6 +2634,8 @@ class MainWindow(QWidget):
             return
 
         other = self.boxes[new_idx]
+        if not other.symbol.text().strip():
+            return  # never swap an active row below an empty one
 
         viewport = self.scroll.viewport()
 
@@ -687,6 +2645,11 @@ class MainWindow(QWidget):
         r1 = QRect(p1, box.size())
         r2 = QRect(p2, other.size())
 
+        if not (viewport.rect().intersects(r1) and viewport.rect().intersects(r2)):
+            self.move_rows([box], new_idx)
+            self.scroll.ensureWidgetVisible(box)
+            return
+
         # Ghost overlays (screenshots) so we can animate freely
         pm1 = box.grab()
         pm2 = other.grab()
@@ -727,24 +2690,14 @@ class MainWindow(QWidget):
         group.addAnimation(a2)
 
         def finalize():
-            # Swap in the list
-            self.boxes[idx], self.boxes[new_idx] = self.boxes[new_idx], self.boxes[idx]
-
-            # Re-add all boxes in new order to preserve positions
-            for b in self.boxes:
-                try:
-                    self.rows_layout.removeWidget(b)
-                except Exception:
-                    pass
-            for i, b in enumerate(self.boxes):
-                self.rows_layout.insertWidget(i, b)
-                b.show()
+            self.move_rows([box], new_idx)
+            box.show()
+            other.show()
 
             ghost1.deleteLater()
             ghost2.deleteLater()
 
-            # Keep + placement correct and ensure moved row is visible
-            self.update_add_buttons()
+            # ensure moved row is visible
             self.scroll.ensureWidgetVisible(box)
 
         group.finished.connect(finalize)
@@ -752,16 +2705,70 @@ class MainWindow(QWidget):
         group.start()
 
     # --- Core refresh logic ---
+    def set_refresh_interval(self, ms):
+        self.timer.setInterval(ms)
+
+    def set_render_fps(self, fps):
+        self.render.set_fps(fps)
+
+    def update_rate_stats(self):
+        """Show ingest and render rates (per second) in the window title."""
+        now = time.monotonic()
+        t0, reads0, quotes0, frames0 = self._last_stats
+        dt = (now - t0) or 1.0
+        self.ingest_rate = (self.reads - reads0) / dt
+        self.quote_rate = (self.render.ingested - quotes0) / dt
+        self.frame_rate = (self.render.frames - frames0) / dt
+        self._last_stats = (now, self.reads, self.render.ingested, self.render.frames)
+        self.setWindowTitle(
+            f"Live Prices — ingest {self.ingest_rate:.0f}/s, "
+            f"{self.quote_rate:.0f} quotes/s — render {self.frame_rate:.0f} fps"
+        )
+
     def refresh_once(self):
+        """Ingest: read the sheet and queue changed quotes for the next frame."""
         try:
             rows = self.source.read_rows()
         except Exception as e:
             print("Read error:", e)
             traceback.print_exc()
             rows = []
+        self.reads += 1
 
         # update last rows dict for search & updates
-        self.last_rows_dict = {sym: (bid, ask, low, high) for sym, bid, ask, low, high in rows}
+        prev_rows = self.last_rows_dict
+        rows_dict = {sym: (bid, ask, low, high) for sym, bid, ask, low, high in rows}
+        changed = {sym: quote for sym, quote in rows_dict.items()
+                   if prev_rows.get(sym) != quote and sym not in self.synthetics}
+
+        # synthetics downstream of the changed rows are recomputed and flow on like rows
+        if self.synthetics.formulas:
+            changed.update(self.synthetics.update(changed))
+            rows_dict.update(self.synthetics.quotes)
+        self.last_rows_dict = rows_dict
+
+        # check alerts, build bars and queue renders for quotes that changed since the last read
+        now = time.time()
+        for sym, quote in changed.items():
+            slot = self.quotes.update(sym, quote, now)
+            self.bars.on_tick(slot, now, self.quotes.mid(slot))
+            if self.publisher:
+                q = self.quotes
+                self.publisher.publish(slot, sym, q.bid[slot], q.ask[slot],
+                                       q.low[slot], q.high[slot], now)
+            if self.staleness.touch(slot):
+                self._stale_count_dirty = True
+            if self.movers and self.movers.update(sym, self.quotes.mid(slot), self.quotes.open[slot]):
+                self._movers_dirty = True
+            if self.sorter and self.sort_column != "symbol" and self.sorter.set(sym, self.sort_key(slot)):
+                self._sort_dirty = True
+            if self.initial_fill_done:
+                self.render.push(sym, quote)
+            fired = self.alerts.on_quote(sym, quote[0], quote[1])
+            if fired:
+                if not self._pending_alerts:
+                    QTimer.singleShot(0, self.dispatch_alerts)
+                self._pending_alerts.extend(fired)
 
         # initial fill: set symbols sequentially once
         if not self.initial_fill_done:
@@ -774,24 +2781,247 @@ class MainWindow(QWidget):
                     box.symbol.setText("")
                     box.update_prices("", "", "", "")
             self.initial_fill_done = True
+            self.index_rows()
+            # from now on only subscribed symbols are read
+            self.subscriptions.update((), self.alerts.symbols())
+            self.sync_watchlist()
+
+        # the set of available symbols only matters for the ➕ row
+        if self.source.directory_version != self._directory_version:
+            self._directory_version = self.source.directory_version
             self.update_add_buttons()
+
+    def apply_quotes(self, batch):
+        """Render pass: apply pending quotes to the rows showing them (Qt coalesces the repaints)."""
+        rows = self.row_by_symbol
+        for sym, quote in batch.items():
+            box = rows.get(sym)
+            if box is not None:
+                box.update_prices(*quote)
+                if box.stale:
+                    box.set_stale(False)
+        if self._stale_count_dirty:
+            self.update_stale_summary()
+        if self._movers_dirty:
+            self._movers_dirty = False
+            self.apply_movers()
+        if self._sort_dirty:
+            self.apply_sort()
+
+    # --- Stale quotes ---
+    def check_stale(self):
+        newly = self.staleness.check(time.time())
+        if newly:
+            for slot in newly:
+                box = self.row_by_symbol.get(self.quotes.symbols[slot])
+                if box is not None:
+                    box.set_stale(True)
+        if newly or self._stale_count_dirty:
+            self.update_stale_summary()
+
+    def update_stale_summary(self):
+        """Header summary: stale symbols among those currently subscribed."""
+        self._stale_count_dirty = False
+        subscribed = self.subscriptions.counts
+        symbols = self.quotes.symbols
+        count = sum(1 for slot in self.staleness.stale if symbols[slot] in subscribed)
+        self.stale_lbl.setText(f"⚠ {count} stale" if count else "")
+
+    # --- Sorting and top movers ---
+    def set_row_order(self, ordered, save=True):
+        """
+        Put the active rows in `ordered` order (empty rows stay below);
+        only rows that are not already in place are moved.
+        """
+        for i, b in enumerate(ordered):
+            if self.boxes[i] is not b:
+                self.boxes.remove(b)
+                self.rows_layout.removeWidget(b)
+                self.boxes.insert(i, b)
+                self.rows_layout.insertWidget(i, b)
+        if save:
+            self.schedule_save()
+
+    def sort_key(self, slot):
+        """Sort key of a quote-table slot for the price sort column (empty prices last)."""
+        value = getattr(self.quotes, self.sort_column)[slot]
+        if math.isnan(value):
+            return (1, 0.0)
+        return (0, -value if self.sort_descending else value)
+
+    def sort_by(self, column):
+        """
+        Keep the board sorted by `column` as quotes tick. Clicking the same
+        header goes ascending → descending → back to the user's order.
+        """
+        if column == self.sort_column and self.sort_descending:
+            self.clear_sort()
+            return
+        descending = (column == self.sort_column)
+        if self.movers:
+            self.set_movers_mode(None)
+        if self.manual_order is None:
+            self.manual_order = self.active_symbols()
+        self.sort_column = column
+        self.sort_descending = descending
+        self.sorter = SortedSymbols()
+        self.reset_sort()
+        self.update_sort_labels()
+
+    def clear_sort(self, keep_order=False):
+        """Stop live sorting; the user's order comes back unless `keep_order`."""
+        if self.sorter is None:
             return
+        self.sorter = None
+        self.sort_column = None
+        self.sort_descending = False
+        self._sort_dirty = False
+        self.update_sort_labels()
+        order, self.manual_order = self.manual_order, None
+        if not keep_order and order is not None:
+            rows = self.row_by_symbol
+            self.set_row_order([rows[s] for s in order if s in rows], save=False)
+
+    def update_sort_labels(self):
+        for name, lbl in self.header_labels.items():
+            text = name.capitalize()
+            if name == self.sort_column:
+                text += " ▼" if self.sort_descending else " ▲"
+            lbl.setText(text)
+
+    def reset_sort(self):
+        """Rank the symbols of the active board by the sort column."""
+        if not self.sorter:
+            return
+        symbols = self.active_symbols()
+        if self.sort_column == "symbol":
+            ordered = sorted(symbols, key=str.upper, reverse=self.sort_descending)
+            keys = {s: (0, i) for i, s in enumerate(ordered)}
+        else:
+            slots = self.quotes.slots
+            keys = {s: self.sort_key(slots[s]) if s in slots else (1, 0.0) for s in symbols}
+        self.sorter.reset(keys)
+        self.apply_sort()
+
+    def apply_sort(self):
+        """Move rows only when the sorted order differs from the board."""
+        if not self.sorter:
+            return
+        self._sort_dirty = False
+        rows = self.row_by_symbol
+        ordered = [rows[s] for s in self.sorter.top() if s in rows]
+        if ordered != self.boxes[:len(ordered)]:
+            self.set_row_order(ordered, save=False)  # the sorted view is never persisted
+
+    def cycle_movers_mode(self):
+        if self.movers is None:
+            self.set_movers_mode("abs")
+        elif not self.movers.percent:
+            self.set_movers_mode("pct")
+        else:
+            self.set_movers_mode(None)
+
+    def set_movers_mode(self, mode):
+        """mode: None (off), "abs" or "pct" change since the first quote."""
+        if mode is None:
+            if self.movers is None:
+                return
+            self.movers = None
+            self.status_lbl.setText("")
+            if self.manual_order is not None:
+                order, self.manual_order = self.manual_order, None
+                rows = self.row_by_symbol
+                self.set_row_order([rows[s] for s in order if s in rows], save=False)
+            return
+        self.clear_sort()
+        if self.manual_order is None:
+            self.manual_order = self.active_symbols()
+        self.movers = MoverRanking(percent=(mode == "pct"))
+        self.reset_movers()
+        self.status_lbl.setText("Top movers " + ("%" if self.movers.percent else "Δ"))
+
+    def reset_movers(self):
+        """Rank the symbols of the active board."""
+        if not self.movers:
+            return
+        self.movers.reset(self.active_symbols())
+        for sym in self.active_symbols():
+            slot = self.quotes.slots.get(sym)
+            if slot is not None:
+                self.movers.update(sym, self.quotes.mid(slot), self.quotes.open[slot])
+        self._movers_dirty = True
+        self.apply_movers(force=True)
+
+    def apply_movers(self, force=False):
+        """
+        Move rows only when the top-K ranking changed by more than the
+        hysteresis: a challenger must beat the row it displaces by
+        MOVERS_HYSTERESIS (relative) to take its place.
+        """
+        if not self.movers:
+            return
+        active = [b for b in self.boxes if b.symbol.text().strip()]
+        by_symbol = {b.symbol.text().strip(): b for b in active}
+        top = [s for s in self.movers.top(MOVERS_TOP_K) if s in by_symbol]
+        shown = [b.symbol.text().strip() for b in active[:len(top)]]
+        if top == shown:
+            return
+        if not force:
+            score = self.movers.score
+            significant = any(
+                want != have and score(want) > score(have) * (1 + MOVERS_HYSTERESIS)
+                for want, have in zip(top, shown)
+            )
+            if not significant:
+                return
+        top_rows = [by_symbol[s] for s in top]
+        rest = [b for b in active if b not in top_rows]
+        self.set_row_order(top_rows + rest, save=False)  # the ranking is never persisted
+
+    # --- Snapshot export ---
+    def set_export_interval(self, seconds):
+        self.export_interval = seconds
+        if seconds and seconds > 0:
+            self.export_timer.start(int(seconds * 1000))
+        else:
+            self.export_timer.stop()
 
-        # after initial fill: only update boxes that have a symbol
-        for box in self.boxes:
-            sym = box.symbol.text().strip()
-            if sym and sym in self.last_rows_dict:
-                bid, ask, low, high = self.last_rows_dict[sym]
-                box.update_prices(bid, ask, low, high)
+    def export_scheduled(self):
+        try:
+            self.exporter.export()
+        except ValueError as e:
+            print("Export error:", e)
+            self.export_timer.stop()
 
-        self.update_add_buttons()
+    def export_now(self):
+        try:
+            path = self.exporter.export(time.strftime("snapshot-%Y%m%d-%H%M%S"))
+        except ValueError as e:
+            QMessageBox.warning(self, "Export", str(e))
+            return
+        self.setWindowTitle(f"Live Prices — exporting {path}")
 
-    def closeEvent(self, event):
-        try: self.timer.stop()
-        except Exception: pass
-        try: self.source.close()
-        except Exception: pass
-        super().closeEvent(event)
+    def dispatch_alerts(self):
+        """Log fired alerts and highlight their rows for a few seconds."""
+        events, self._pending_alerts = self._pending_alerts, []
+        if not events:
+            return
+        self.alert_log.add_events(events)
+        until = time.monotonic() + ALERT_HIGHLIGHT_MS / 1000
+        for _, alert, _ in events:
+            self.alert_until[alert.symbol] = until
+        self.update_alert_highlights()
+
+    def update_alert_highlights(self):
+        """Highlight rows whose symbol fired recently; re-arm the timer for the next expiry."""
+        now = time.monotonic()
+        for sym in [s for s, until in self.alert_until.items() if until <= now]:
+            del self.alert_until[sym]
+        for box in self.boxes:
+            box.set_alert_highlight(box.symbol.text().strip() in self.alert_until)
+        if self.alert_until:
+            wait = min(self.alert_until.values()) - now
+            self.alert_timer.start(max(1, int(wait * 1000) + 1))
 
     def toggle_fullscreen(self):
         if not self.is_fullscreen:
@@ -803,26 +3033,35 @@ class MainWindow(QWidget):
 
     # Close dropdown/input when clicking outside
     def eventFilter(self, obj, event):
-        if event.type() == QEvent.MouseButtonPress:
-            gp = event.globalPos()
-            for box in self.boxes:
-                if box.dropdown.isVisible() or box.input.isVisible():
-                    inside_input = False
-                    if box.input.isVisible():
-                        local_pt = box.input.mapFromGlobal(gp)
-                        if box.input.rect().contains(local_pt):
-                            inside_input = True
-
-                    inside_dropdown = False
-                    if box.dropdown.isVisible():
-                        if box.dropdown.geometry().contains(gp):
-                            inside_dropdown = True
-
-                    if not inside_input and not inside_dropdown:
-                        box.dropdown.hide()
-                        box.input.hide()
-                        self.update_add_buttons()
+        if event.type() == QEvent.MouseButtonPress and obj.property("column"):
+            self.sort_by(obj.property("column"))
+            return True
+        if obj is self.rows_container and event.type() in (QEvent.DragEnter, QEvent.DragMove, QEvent.Drop):
+            if not (self._drag_rows and event.mimeData().hasFormat(ROW_MIME)):
+                return False
+            event.acceptProposedAction()
+            if event.type() == QEvent.Drop:
+                self.drop_rows(event.pos().y())
+            return True
+        if event.type() == QEvent.MouseButtonPress and self.picker.is_open():
+            if not self.picker.contains(event.globalPos()):
+                self.picker.close()
+                self.update_add_buttons()
         return super().eventFilter(obj, event)
+
+    def widget_stats(self):
+        """Live widget count for the whole app and per board row."""
+        total = len(QApplication.allWidgets())
+        rows = len(self.boxes)
+        per_row = sum(1 + len(b.findChildren(QWidget)) for b in self.boxes) / rows if rows else 0
+        return total, rows, per_row
+
+    def show_widget_stats(self):
+        total, rows, per_row = self.widget_stats()
+        QMessageBox.information(
+            self, "Widgets",
+            f"{total} widgets in total\n{rows} rows, {per_row:.1f} widgets per row"
+        )
     
     
 
@@ -837,6 +3076,7 @@ class MainWindow(QWidget):
         self.close()
         
     def apply_font_to_widgets(self):
+        GlyphCache.invalidate()  # rebuilt lazily on the next paint
         for box in self.boxes:
             for lbl in [box.symbol, box.bid, box.ask, box.high, box.low]:
                 lbl.setFont(self.current_font)
@@ -850,20 +3090,50 @@ class MainWindow(QWidget):
     def closeEvent(self, event):
         try: self.timer.stop()
         except Exception: pass
+        try: self.render.stop()
+        except Exception: pass
+        try: self.flash_clock.stop()
+        except Exception: pass
+        try: self.stale_timer.stop()
+        except Exception: pass
+        try:
+            if self.publisher:
+                self.publisher.close()
+                self.publisher = None
+        except Exception: pass
+        try:
+            self.bar_timer.stop()
+            self.bars.close()
+        except Exception: pass
+        try:
+            self.export_timer.stop()
+            self.exporter.close()
+        except Exception: pass
         try: self.source.close()
         except Exception: pass
+        try:
+            self.save_timer.stop()
+            self.save_settings()
+        except Exception: traceback.print_exc()
+        self.settings_writer.close()
+        super().closeEvent(event)
 
-        # Save current config
-        rows = [b.symbol.text().strip() for b in self.boxes]
-        save_config(
+    def save_settings(self):
+        """Queue the current board (watchlists, font, theme, rates) for writing."""
+        self.sync_watchlist()
+        self.settings_writer.save(settings_dict(
             self.source.path,
             self.source.sheet_name,
-            rows=rows,
             font=self.current_font,
-            is_darkmode=self.is_darkmode
-        )
-
-        super().closeEvent(event)
+            is_darkmode=self.is_darkmode,
+            refresh_ms=self.timer.interval(),
+            render_fps=self.render.fps,
+            watchlists=self.watchlists,
+            active_watchlist=self.active_watchlist,
+            export={"DIR": self.exporter.folder, "FORMAT": self.exporter.format,
+                    "INTERVAL_S": self.export_interval},
+            stale=self.staleness.overrides
+        ))
 
 
 
@@ -878,8 +3148,14 @@ if __name__ == "__main__":
         file_path = config_data.get("FILE_PATH", "")
         sheet_name = config_data.get("SHEET_NAME", "")
         saved_rows = config_data.get("ROWS", [])
+        watchlists = config_data.get("WATCHLISTS") or {DEFAULT_WATCHLIST: saved_rows}
+        active_watchlist = config_data.get("ACTIVE_WATCHLIST")
+        export = config_data["EXPORT"]
+        stale_overrides = config_data["STALE"]
         is_darkmode = config_data.get("IS_DARKMODE", True)
         current_font = config_data.get("FONT", QFont("Arial", 10))
+        refresh_ms = config_data["REFRESH_INTERVAL_MS"]
+        render_fps = config_data["RENDER_FPS"]
     else:
         # Ask user to select Excel file & sheet
         from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QFormLayout, QComboBox
@@ -956,21 +3232,29 @@ if __name__ == "__main__":
         file_path = config_data["FILE_PATH"]
         sheet_name = config_data["SHEET_NAME"]
         saved_rows = []
+        watchlists = {}
+        active_watchlist = None
+        export = {"DIR": EXPORT_DIR, "FORMAT": EXPORT_FORMAT, "INTERVAL_S": EXPORT_INTERVAL_S}
+        stale_overrides = {}
         is_darkmode = True
         current_font = QFont("Arial", 10)
+        refresh_ms = REFRESH_INTERVAL_MS
+        render_fps = RENDER_FPS
 
     # Initialize main window
-    window = MainWindow(file_path, sheet_name)
+    window = MainWindow(file_path, sheet_name, refresh_ms, render_fps, stale_overrides)
     window.is_darkmode = is_darkmode
     window.current_font = current_font
     window.apply_theme()
     window.apply_font_to_widgets()
-
-    # Restore saved rows if any
-    for i, box in enumerate(window.boxes):
-        if i < len(saved_rows):
-            box.symbol.setText(saved_rows[i])
-    window.update_add_buttons()
+    window.exporter.folder = export["DIR"]
+    window.exporter.format = export["FORMAT"]
+    window.set_export_interval(export["INTERVAL_S"])
+
+    # Restore saved watchlists if any
+    watchlists = {name: [s for s in syms if s] for name, syms in watchlists.items()}
+    if any(watchlists.values()):
+        window.set_watchlists(watchlists, active_watchlist)
 
     window.showMaximized()
     sys.exit(app.exec_())
@@ -0,0 +1,248 @@
+"""
+Shared-memory quote table published by liveprices.py.
+
+Layout (little endian):
+    header     magic "LPQT", version, capacity, count, directory seq,
+               writer state, writer heartbeat (epoch s)
+    directory  capacity x SYMBOL_BYTES, utf-8, NUL padded
+    records    capacity x (seq, bid, ask, low, high, updated)
+
+Each record and the directory are guarded by a seqlock: the writer makes
+the sequence odd, writes, then makes it even again. Readers retry until
+they see the same even sequence before and after reading, so they never
+take a lock and never copy the shared buffer. A sequence that stays odd
+for READ_TIMEOUT_S (writer killed mid-write) raises TimeoutError.
+
+The writer marks the header closed when it exits and refreshes a
+heartbeat while it runs; reads raise ConnectionError once it is closed or
+the heartbeat is older than HEARTBEAT_TIMEOUT_S, so a consumer never
+mistakes a dead board's last prices for live ones. Slots whose symbol the
+board no longer reads are published as NaN and get() returns None for
+them.
+
+Client usage:
+    from quoteshm import QuoteTableReader
+    reader = QuoteTableReader()
+    bid, ask, low, high, updated = reader.get("EURUSD")
+"""
+import os
+import math
+import time
+import struct
+from multiprocessing import shared_memory
+
+# -------------------------------
+# Layout
+# -------------------------------
+SHM_NAME = "liveprices_quotes"
+SHM_CAPACITY = 4096  # max symbols
+SYMBOL_BYTES = 32
+MAGIC = b"LPQT"
+VERSION = 2
+READ_TIMEOUT_S = 0.5  # a sequence stuck odd this long means the writer died mid-write
+HEARTBEAT_TIMEOUT_S = 5.0  # the writer beats about once a second
+WRITER_OPEN = 1
+WRITER_CLOSED = 2
+
+HEADER = struct.Struct("<4sIIIQ")  # magic, version, capacity, count, directory seq
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+VALUES = struct.Struct("<ddddd")  # bid, ask, low, high, updated (epoch s)
+RECORD_SIZE = SEQ.size + VALUES.size
+
+STATE = struct.Struct("<I")
+HEARTBEAT = struct.Struct("<d")
+
+_COUNT_OFFSET = 12
+_DIR_SEQ_OFFSET = 16
+_STATE_OFFSET = 24
+_HEARTBEAT_OFFSET = 32
+
+
+NAN = math.nan
+
+
+def _size(capacity):
+    return HEADER_SIZE + capacity * (SYMBOL_BYTES + RECORD_SIZE)
+
+
+def _record_offset(capacity, slot):
+    return HEADER_SIZE + capacity * SYMBOL_BYTES + slot * RECORD_SIZE
+
+
+def _retry(deadline, what):
+    """Start or check the retry deadline of a seqlock read."""
+    now = time.monotonic()
+    if deadline is None:
+        return now + READ_TIMEOUT_S
+    if now > deadline:
+        raise TimeoutError(f"{what} is stuck mid-write (writer gone?)")
+    return deadline
+
+
+# -------------------------------
+# Writer (used by liveprices.py)
+# -------------------------------
+class QuoteTableWriter:
+    def __init__(self, name=SHM_NAME, capacity=SHM_CAPACITY):
+        self.capacity = capacity
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_size(capacity))
+        except FileExistsError:
+            # left behind by a crashed writer (POSIX only): replace it
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_size(capacity))
+        self.buf = self.shm.buf
+        self.count = 0
+        self._named = bytearray(capacity)  # 1 once a slot's directory entry is written
+        self._dir_seq = 0
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, capacity, 0, 0)
+        self.beat()
+        STATE.pack_into(self.buf, _STATE_OFFSET, WRITER_OPEN)
+
+    def beat(self, now=None):
+        """Refresh the heartbeat; call regularly (readers give up after HEARTBEAT_TIMEOUT_S)."""
+        HEARTBEAT.pack_into(self.buf, _HEARTBEAT_OFFSET, time.time() if now is None else now)
+
+    def _add_symbol(self, slot, symbol):
+        """Add the directory entry for a newly used slot."""
+        self._dir_seq += 1
+        SEQ.pack_into(self.buf, _DIR_SEQ_OFFSET, self._dir_seq)
+        data = symbol.encode("utf-8")[:SYMBOL_BYTES].ljust(SYMBOL_BYTES, b"\0")
+        start = HEADER_SIZE + slot * SYMBOL_BYTES
+        self.buf[start:start + SYMBOL_BYTES] = data
+        self._named[slot] = 1
+        self.count = max(self.count, slot + 1)
+        struct.pack_into("<I", self.buf, _COUNT_OFFSET, self.count)
+        self._dir_seq += 1
+        SEQ.pack_into(self.buf, _DIR_SEQ_OFFSET, self._dir_seq)
+
+    def publish(self, slot, symbol, bid, ask, low, high, updated):
+        """Write one quote; returns False if the table is full."""
+        if slot >= self.capacity:
+            return False
+        if not self._named[slot]:
+            self._add_symbol(slot, symbol)
+        off = _record_offset(self.capacity, slot)
+        seq = SEQ.unpack_from(self.buf, off)[0]
+        SEQ.pack_into(self.buf, off, seq + 1)
+        VALUES.pack_into(self.buf, off + SEQ.size, bid, ask, low, high, updated)
+        SEQ.pack_into(self.buf, off, seq + 2)
+        return True
+
+    def deactivate(self, slot):
+        """Mark a slot no longer read: its prices become NaN (the update time is kept)."""
+        if slot >= self.capacity or not self._named[slot]:
+            return
+        off = _record_offset(self.capacity, slot)
+        updated = VALUES.unpack_from(self.buf, off + SEQ.size)[4]
+        seq = SEQ.unpack_from(self.buf, off)[0]
+        SEQ.pack_into(self.buf, off, seq + 1)
+        VALUES.pack_into(self.buf, off + SEQ.size, NAN, NAN, NAN, NAN, updated)
+        SEQ.pack_into(self.buf, off, seq + 2)
+
+    def close(self):
+        # attached readers keep the mapping after unlink; tell them first
+        STATE.pack_into(self.buf, _STATE_OFFSET, WRITER_CLOSED)
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# -------------------------------
+# Reader (client library)
+# -------------------------------
+class QuoteTableReader:
+    def __init__(self, name=SHM_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # only the writer owns the segment; stop our resource tracker
+            # from unlinking it when this process exits
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            except Exception:
+                pass
+        self.buf = self.shm.buf
+        magic, version, self.capacity, _, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{name} is not a liveprices quote table (v{VERSION})")
+        self._slots = {}
+        self._dir_seq = None
+
+    def _read_directory(self):
+        deadline = None
+        while True:
+            seq = SEQ.unpack_from(self.buf, _DIR_SEQ_OFFSET)[0]
+            if seq & 1:
+                deadline = _retry(deadline, "directory")
+                continue
+            count = struct.unpack_from("<I", self.buf, _COUNT_OFFSET)[0]
+            slots = {}
+            for slot in range(count):
+                start = HEADER_SIZE + slot * SYMBOL_BYTES
+                raw = bytes(self.buf[start:start + SYMBOL_BYTES]).rstrip(b"\0")
+                if raw:  # slots below the high-water mark may not be named yet
+                    slots[raw.decode("utf-8", "replace")] = slot
+            if SEQ.unpack_from(self.buf, _DIR_SEQ_OFFSET)[0] != seq:
+                deadline = _retry(deadline, "directory")
+            else:
+                self._slots = slots
+                self._dir_seq = seq
+                return
+
+    def symbols(self):
+        if SEQ.unpack_from(self.buf, _DIR_SEQ_OFFSET)[0] != self._dir_seq:
+            self._read_directory()
+        return list(self._slots)
+
+    def check_writer(self):
+        """Raise ConnectionError if the board closed the table or stopped beating."""
+        if STATE.unpack_from(self.buf, _STATE_OFFSET)[0] != WRITER_OPEN:
+            raise ConnectionError("quote table closed by the writer")
+        age = time.time() - HEARTBEAT.unpack_from(self.buf, _HEARTBEAT_OFFSET)[0]
+        if age > HEARTBEAT_TIMEOUT_S:
+            raise ConnectionError(f"quote table writer silent for {age:.0f}s")
+
+    def read_slot(self, slot):
+        """
+        (bid, ask, low, high, updated) for `slot`, consistent under concurrent
+        writes. Raises TimeoutError if the record stays mid-write and
+        ConnectionError if the writer is gone.
+        """
+        self.check_writer()
+        off = _record_offset(self.capacity, slot)
+        deadline = None
+        while True:
+            seq = SEQ.unpack_from(self.buf, off)[0]
+            if not seq & 1:
+                values = VALUES.unpack_from(self.buf, off + SEQ.size)
+                if SEQ.unpack_from(self.buf, off)[0] == seq:
+                    return values
+            deadline = _retry(deadline, f"slot {slot}")
+
+    def get(self, symbol):
+        """
+        Latest quote for `symbol`, or None if it has not been published or
+        the board no longer reads it.
+        """
+        slot = self._slots.get(symbol)
+        if slot is None:
+            self.symbols()
+            slot = self._slots.get(symbol)
+            if slot is None:
+                self.check_writer()
+                return None
+        values = self.read_slot(slot)
+        if math.isnan(values[0]) and math.isnan(values[1]):
+            return None
+        return values
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
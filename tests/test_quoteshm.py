@@ -0,0 +1,52 @@
+import os
+import time
+
+import pytest
+
+from quoteshm import QuoteTableReader, QuoteTableWriter, HEARTBEAT_TIMEOUT_S
+
+
+@pytest.fixture
+def table():
+    name = f"lpq_test_{os.getpid()}"
+    writer = QuoteTableWriter(name, capacity=16)
+    reader = QuoteTableReader(name)
+    yield writer, reader
+    reader.close()
+    if writer.buf is not None:
+        writer.close()
+
+
+def test_out_of_order_slots_are_named(table):
+    writer, reader = table
+    writer.publish(2, "EURJPY", 162.0, 162.1, 161.0, 163.0, 1.0)
+    writer.publish(1, "USDJPY", 150.0, 150.1, 149.0, 151.0, 2.0)
+    assert reader.get("USDJPY") == (150.0, 150.1, 149.0, 151.0, 2.0)
+    assert reader.get("EURJPY")[0] == 162.0
+
+
+def test_deactivated_slot_reads_as_missing(table):
+    writer, reader = table
+    writer.publish(0, "EURUSD", 1.08, 1.0802, 1.07, 1.09, 5.0)
+    writer.deactivate(0)
+    assert reader.get("EURUSD") is None
+    writer.publish(0, "EURUSD", 1.081, 1.0812, 1.07, 1.09, 6.0)
+    assert reader.get("EURUSD")[0] == 1.081
+
+
+def test_closed_writer_raises(table):
+    writer, reader = table
+    writer.publish(0, "EURUSD", 1.08, 1.0802, 1.07, 1.09, 5.0)
+    writer.close()
+    with pytest.raises(ConnectionError):
+        reader.get("EURUSD")
+
+
+def test_silent_writer_raises(table):
+    writer, reader = table
+    writer.publish(0, "EURUSD", 1.08, 1.0802, 1.07, 1.09, 5.0)
+    writer.beat(time.time() - HEARTBEAT_TIMEOUT_S - 1)
+    with pytest.raises(ConnectionError):
+        reader.get("EURUSD")
+    writer.beat()
+    assert reader.get("EURUSD")[0] == 1.08
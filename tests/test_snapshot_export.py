@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("xlwings")
+liveprices = pytest.importorskip("liveprices")
+
+
+def make_table():
+    quotes = liveprices.QuoteTable()
+    quotes.update("EURUSD", ("1.08", "1.0802", "1.07", "1.09"), 100.0)
+    quotes.update("GBPUSD", ("1.27", "1.2703", "1.26", "1.28"), 100.0)
+    quotes.update("USDJPY", ("150.1", "150.12", "149.5", "150.5"), 100.0)
+    return quotes
+
+
+def test_snapshot_exports_all_slots_while_everything_is_read():
+    exporter = liveprices.SnapshotExporter(make_table())
+    try:
+        assert exporter.snapshot()["symbol"] == ["EURUSD", "GBPUSD", "USDJPY"]
+    finally:
+        exporter.close()
+
+
+def test_snapshot_skips_unsubscribed_symbol():
+    quotes = make_table()
+    assert quotes.set_live({"EURUSD", "USDJPY"}) == [quotes.slots["GBPUSD"]]
+    exporter = liveprices.SnapshotExporter(quotes)
+    try:
+        columns = exporter.snapshot()
+    finally:
+        exporter.close()
+    assert columns["symbol"] == ["EURUSD", "USDJPY"]
+    assert list(columns["bid"]) == [1.08, 150.1]
+    assert all(len(col) == 2 for col in columns.values())
+
+
+def test_resubscribed_symbol_is_exported_again():
+    quotes = make_table()
+    quotes.set_live({"EURUSD"})
+    quotes.set_live({"EURUSD", "GBPUSD"})
+    quotes.update("GBPUSD", ("1.271", "1.2713", "", ""), 101.0)
+    exporter = liveprices.SnapshotExporter(quotes)
+    try:
+        columns = exporter.snapshot()
+    finally:
+        exporter.close()
+    assert columns["symbol"] == ["EURUSD", "GBPUSD"]
+    assert math.isnan(columns["low"][1])